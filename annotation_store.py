@@ -0,0 +1,287 @@
+"""Anotações persistentes em SQLite, por vídeo (hash), com gravação em lote.
+
+O `AnnotationStore` se comporta como o dicionário `{frame: nota}` que os apps
+já usavam, mas cada alteração é gravada em disco por uma thread própria em
+transações agrupadas (a cada `FLUSH_INTERVAL` segundos), então navegar entre
+frames nunca espera por fsync e uma queda perde no máximo esse intervalo. O
+banco usa WAL e chave primária (vídeo, frame), e as leituras acontecem só na
+abertura: a interface consulta sempre a cópia em memória.
+
+Além das notas por frame há as anotações por trecho (início, fim, nota e
+tags), gravadas do mesmo jeito e consultadas por um `IntervalIndex`: achar os
+trechos que cobrem o frame exibido não percorre a lista inteira.
+
+Se uma gravação falha (disco cheio, banco travado por outro app), o lote volta
+para a fila e é regravado com espera crescente; o erro fica em `last_error`
+até a próxima gravação bem-sucedida, para a interface avisar o usuário.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+
+from frame_index import cache_dir
+from intervals import IntervalIndex
+
+FLUSH_INTERVAL = 0.5
+RETRY_MAX = 30.0  # espera máxima entre tentativas de regravar um lote que falhou
+_DELETED = object()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    video_hash TEXT NOT NULL,
+    frame INTEGER NOT NULL,
+    note TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (video_hash, frame)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ranges (
+    video_hash TEXT NOT NULL,
+    range_id INTEGER NOT NULL,
+    start_frame INTEGER NOT NULL,
+    end_frame INTEGER NOT NULL,
+    note TEXT NOT NULL,
+    tags TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (video_hash, range_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS videos (
+    video_hash TEXT PRIMARY KEY,
+    global_comment TEXT NOT NULL DEFAULT ''
+);
+"""
+
+
+def parse_tags(text):
+    """"falha, oclusão" -> ("falha", "oclusão")"""
+    return tuple(t.strip() for t in text.split(",") if t.strip())
+
+
+def default_db_path():
+    return os.path.join(cache_dir("annotations"), "annotations.sqlite3")
+
+
+def _connect(path):
+    # o Streamlit roda cada rerun numa thread diferente: o acesso é serializado por travas próprias
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # com WAL: sem fsync a cada commit
+    return conn
+
+
+class AnnotationStore(MutableMapping):
+    """Dicionário {frame: nota} de um vídeo, salvo automaticamente em SQLite"""
+
+    def __init__(self, video_hash, db_path=None):
+        self.video_hash = video_hash
+        self.db_path = db_path or default_db_path()
+        self._notes = {}
+        self._global_comment = ""
+        self._ranges = {}  # id -> (id, início, fim, nota, tags)
+        self._range_index = None  # remontado na próxima consulta após uma edição
+        self._pending = {}
+        self._pending_ranges = {}
+        self._pending_comment = None
+        self._cond = threading.Condition()
+        self._writing = False
+        self._urgent = False
+        self._closed = False
+        self._attempts = 0
+        self.last_error = None  # exceção da última gravação, se falhou
+
+        # tudo é lido uma vez na abertura; daí em diante o banco só recebe gravações
+        reader = _connect(self.db_path)
+        try:
+            reader.executescript(_SCHEMA)
+            self._notes = dict(reader.execute(
+                "SELECT frame, note FROM notes WHERE video_hash = ?", (video_hash,)))
+            for range_id, start, end, note, tags in reader.execute(
+                    "SELECT range_id, start_frame, end_frame, note, tags FROM ranges WHERE video_hash = ?",
+                    (video_hash,)):
+                self._ranges[range_id] = (range_id, start, end, note, parse_tags(tags))
+            row = reader.execute(
+                "SELECT global_comment FROM videos WHERE video_hash = ?", (video_hash,)).fetchone()
+            self._global_comment = row[0] if row else ""
+        finally:
+            reader.close()
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    # --- Interface de dicionário ---
+    def __getitem__(self, frame_number):
+        return self._notes[frame_number]
+
+    def __setitem__(self, frame_number, note):
+        frame_number = int(frame_number)
+        if self._notes.get(frame_number) == note:
+            return
+        self._notes[frame_number] = note
+        self._queue(frame_number, note)
+
+    def __delitem__(self, frame_number):
+        del self._notes[frame_number]
+        self._queue(int(frame_number), _DELETED)
+
+    def __iter__(self):
+        return iter(self._notes)
+
+    def __len__(self):
+        return len(self._notes)
+
+    def __contains__(self, frame_number):
+        return frame_number in self._notes
+
+    @property
+    def global_comment(self):
+        return self._global_comment
+
+    @global_comment.setter
+    def global_comment(self, text):
+        if text == self._global_comment:
+            return
+        self._global_comment = text
+        with self._cond:
+            self._pending_comment = text
+            self._cond.notify()
+
+    # --- Anotações por trecho ---
+    def ranges(self):
+        """[(id, início, fim, nota, tags)] em ordem de início"""
+        return sorted(self._ranges.values(), key=lambda r: (r[1], r[2], r[0]))
+
+    def set_range(self, range_id, start, end, note, tags=()):
+        """Cria ou substitui o trecho range_id (frames start..end, inclusive)"""
+        start, end = sorted((int(start), int(end)))
+        entry = (range_id, start, end, note, tuple(tags))
+        if self._ranges.get(range_id) == entry:
+            return
+        self._ranges[range_id] = entry
+        self._range_index = None
+        self._queue_range(range_id, entry)
+
+    def add_range(self, start, end, note, tags=()):
+        """Novo trecho; devolve o id"""
+        range_id = max(self._ranges, default=0) + 1
+        self.set_range(range_id, start, end, note, tags)
+        return range_id
+
+    def remove_range(self, range_id):
+        del self._ranges[range_id]
+        self._range_index = None
+        self._queue_range(range_id, _DELETED)
+
+    def ranges_at(self, frame_number):
+        """Trechos que contêm frame_number, em ordem de início (O(log n) por trecho)"""
+        if self._range_index is None:
+            self._range_index = IntervalIndex((r[1], r[2], r[0]) for r in self._ranges.values())
+        return [self._ranges[i] for i in self._range_index.at(frame_number)]
+
+    # --- Gravação em lote ---
+    def _queue(self, frame_number, note):
+        with self._cond:
+            self._pending[frame_number] = note
+            self._cond.notify()
+
+    def _queue_range(self, range_id, entry):
+        with self._cond:
+            self._pending_ranges[range_id] = entry
+            self._cond.notify()
+
+    def _write_loop(self):
+        conn = _connect(self.db_path)
+        delay = FLUSH_INTERVAL
+        try:
+            while True:
+                with self._cond:
+                    while not self._has_pending() and not self._closed:
+                        self._cond.wait()
+                    # junta as alterações do intervalo numa transação (flush/close não
+                    # esperam); depois de uma falha, o intervalo é a espera da nova tentativa
+                    deadline = time.monotonic() + delay
+                    while not (self._closed or self._urgent):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    self._urgent = False
+                    closing = self._closed
+                    pending, self._pending = self._pending, {}
+                    ranges, self._pending_ranges = self._pending_ranges, {}
+                    comment, self._pending_comment = self._pending_comment, None
+                    self._writing = True
+                error = None
+                try:
+                    # fora da trava: a interface continua anotando enquanto o disco trabalha
+                    self._write(conn, pending, ranges, comment)
+                except Exception as exc:  # disco cheio, "database is locked"...
+                    error = exc
+                with self._cond:
+                    self._writing = False
+                    self._attempts += 1
+                    self.last_error = error
+                    if error is not None:
+                        # o lote volta para a fila sem apagar o que mudou durante a gravação
+                        self._pending = {**pending, **self._pending}
+                        self._pending_ranges = {**ranges, **self._pending_ranges}
+                        if self._pending_comment is None:
+                            self._pending_comment = comment
+                    self._cond.notify_all()
+                if closing:
+                    return
+                delay = FLUSH_INTERVAL if error is None else min(delay * 2, RETRY_MAX)
+        finally:
+            conn.close()
+
+    def _has_pending(self):
+        return bool(self._pending) or bool(self._pending_ranges) or self._pending_comment is not None
+
+    def _write(self, conn, pending, ranges, comment):
+        if not pending and not ranges and comment is None:
+            return
+        now = time.time()
+        upserts = [(self.video_hash, f, n, now) for f, n in pending.items() if n is not _DELETED]
+        deletes = [(self.video_hash, f) for f, n in pending.items() if n is _DELETED]
+        with conn:
+            conn.executemany(
+                "INSERT INTO notes (video_hash, frame, note, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (video_hash, frame) DO UPDATE SET note = excluded.note, updated_at = excluded.updated_at",
+                upserts)
+            conn.executemany("DELETE FROM notes WHERE video_hash = ? AND frame = ?", deletes)
+            conn.executemany(
+                "INSERT INTO ranges (video_hash, range_id, start_frame, end_frame, note, tags, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (video_hash, range_id) DO UPDATE SET "
+                "start_frame = excluded.start_frame, end_frame = excluded.end_frame, note = excluded.note, "
+                "tags = excluded.tags, updated_at = excluded.updated_at",
+                [(self.video_hash, i, r[1], r[2], r[3], ", ".join(r[4]), now)
+                 for i, r in ranges.items() if r is not _DELETED])
+            conn.executemany(
+                "DELETE FROM ranges WHERE video_hash = ? AND range_id = ?",
+                [(self.video_hash, i) for i, r in ranges.items() if r is _DELETED])
+            if comment is not None:
+                conn.execute(
+                    "INSERT INTO videos (video_hash, global_comment) VALUES (?, ?) "
+                    "ON CONFLICT (video_hash) DO UPDATE SET global_comment = excluded.global_comment",
+                    (self.video_hash, comment))
+
+    def flush(self):
+        """Espera até que tudo o que foi alterado esteja no banco (ou até uma
+        gravação falhar: veja `last_error`)"""
+        with self._cond:
+            if self._has_pending():
+                self._urgent = True
+                self._cond.notify_all()
+            attempts = self._attempts
+            while (self._has_pending() or self._writing) and self._writer.is_alive():
+                if self.last_error is not None and self._attempts != attempts:
+                    break
+                self._cond.wait(timeout=1)
+
+    def close(self):
+        """Grava o que falta e fecha o banco (se essa última gravação falhar, o
+        erro fica em `last_error`)"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
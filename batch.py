@@ -0,0 +1,100 @@
+"""Relatórios em lote, sem interface: `python -m j1nx batch VIDEOS_DIR ...`
+
+Para cada vídeo do diretório procura um arquivo de anotações com o mesmo nome
+(`<vídeo>.json` ou `<vídeo>.csv`, no próprio diretório ou em --annotations) e
+gera `<vídeo>.csv` e `<vídeo>.pdf` em --out. Os vídeos são processados num
+pool de processos com número limitado de workers; relatórios já gerados e mais
+novos que o vídeo e as anotações são pulados, então uma execução interrompida
+pode simplesmente ser repetida.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from extraction import default_workers, extract_thumbnails
+from frame_index import load_or_build_index
+from reports import load_annotations, report_frames, write_csv, write_pdf
+from thumb_store import THUMB_SIZE
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov")
+
+
+def find_jobs(videos_dir, annotations_dir, out_dir):
+    """[(vídeo, anotações, csv de saída, pdf de saída)] em ordem alfabética"""
+    jobs = []
+    for name in sorted(os.listdir(videos_dir)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in VIDEO_EXTENSIONS:
+            continue
+        for candidate in (f"{stem}.json", f"{stem}.csv"):
+            annotations = os.path.join(annotations_dir, candidate)
+            if os.path.exists(annotations):
+                break
+        else:
+            continue
+        jobs.append((
+            os.path.join(videos_dir, name),
+            annotations,
+            os.path.join(out_dir, f"{stem}.csv"),
+            os.path.join(out_dir, f"{stem}.pdf"),
+        ))
+    return jobs
+
+
+def is_done(video, annotations, csv_path, pdf_path):
+    newest_input = max(os.path.getmtime(video), os.path.getmtime(annotations))
+    return all(os.path.exists(p) and os.path.getmtime(p) >= newest_input for p in (csv_path, pdf_path))
+
+
+def render_reports(video, annotations_path, csv_path, pdf_path):
+    """Gera os dois relatórios de um vídeo (roda num processo do pool)"""
+    annotations, ranges, global_comment = load_annotations(annotations_path)
+    index = load_or_build_index(video)
+    # o paralelismo já está entre vídeos: extração numa única passada neste processo
+    frames = [f for f in report_frames(annotations, ranges) if 0 <= f < index.frame_count]
+    thumbnails = dict(extract_thumbnails(video, index, frames, size=THUMB_SIZE, workers=1))
+    write_csv(csv_path, annotations, global_comment, ranges)
+    write_pdf(pdf_path, annotations, global_comment, thumbnails, ranges=ranges)
+    return len(annotations) + len(ranges)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m j1nx batch", description="Gera relatórios CSV/PDF em lote.")
+    parser.add_argument("videos", help="diretório com os vídeos")
+    parser.add_argument("--annotations", help="diretório com os arquivos de anotações (padrão: o dos vídeos)")
+    parser.add_argument("--out", default="relatorios", help="diretório de saída (padrão: ./relatorios)")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="processos em paralelo")
+    parser.add_argument("--force", action="store_true", help="refaz relatórios já existentes")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    jobs = find_jobs(args.videos, args.annotations or args.videos, args.out)
+    pending = [job for job in jobs if args.force or not is_done(*job)]
+    print(f"{len(jobs)} vídeo(s) com anotações, {len(jobs) - len(pending)} já concluído(s), {len(pending)} a gerar.")
+    if not pending:
+        return 0
+
+    failures = 0
+    started = time.monotonic()
+    # "spawn", como em extraction.py: nada de travas herdadas de threads do processo pai
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(pending))),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(render_reports, *job): job for job in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            name = os.path.basename(futures[future][0])
+            try:
+                count = future.result()
+                print(f"[{done}/{len(pending)}] {name}: {count} anotação(ões) ok")
+            except Exception as e:
+                failures += 1
+                print(f"[{done}/{len(pending)}] {name}: FALHOU ({e})", file=sys.stderr)
+
+    print(f"Concluído em {time.monotonic() - started:.1f}s, {failures} falha(s).")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
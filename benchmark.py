@@ -0,0 +1,393 @@
+"""Benchmarks de navegação e exportação com vídeos sintéticos: `python benchmark.py`
+
+Gera vídeos de teste localmente com `cv2.VideoWriter` (resoluções, codecs e
+durações diferentes; o VideoWriter não expõe o tamanho do GOP, então o caso de
+GOP longo em H.264 é escrito com PyAV quando instalado) e mede, pelos mesmos
+caminhos de código dos apps:
+
+* contagem de frames: varredura do índice e reabertura pelo arquivo lateral;
+* busca aleatória, passo para frente e para trás: `FrameNavigator.get` + `FrameRenderer.render`,
+  como no `show_frame`;
+* scrub: `get_preview` + render de prévia, como ao arrastar o slider; com
+  `--backends` a navegação é medida também em cada backend de decodificação
+  (métricas `random_seek@pyav`...), para escolher o mais rápido por codec;
+* exportação CSV/PDF do desktop (`export_pdf`) e PDF do Streamlit (`build_pdf_report`):
+  tempo e pico de memória (tracemalloc, numa segunda execução).
+
+Os resultados saem em JSON e podem ser comparados com uma linha de base salva
+antes (`--save-baseline`, a primeira coisa a rodar em cada máquina: a base não
+vem no repositório porque os tempos dependem do hardware): métricas mais lentas
+que a base além do limite fazem o comando terminar com código 1. Todas as
+métricas são "menor é melhor".
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import runpy
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from fractions import Fraction
+
+import cv2
+import numpy as np
+
+from display import FrameRenderer
+from extraction import extract_thumbnails
+from frame_index import build_index, load_or_build_index
+from frame_source import BACKENDS, available_backends, choose_backend, open_source
+from navigator import FrameNavigator
+from reports import VOLUME_SIZE, write_csv, write_pdf
+from thumb_store import ThumbnailStore
+
+try:
+    import av  # PyAV (opcional): único jeito de escrever H.264 com GOP longo
+except ImportError:
+    av = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_WORKDIR = os.path.join(tempfile.gettempdir(), "j1nx-bench")
+DEFAULT_BASELINE = os.path.join(HERE, "benchmark_baseline.json")
+DEFAULT_THRESHOLD = 0.25  # até 25% mais lento que a base ainda passa
+MIN_DELTA = 0.5  # ms / MB: diferenças absolutas menores que isso são ruído
+
+# nome: (largura, altura, codec, frames, gop); codec "h264" usa PyAV
+VIDEOS = {
+    "480p_mp4v": (854, 480, "mp4v", 300, None),
+    "480p_mjpg": (854, 480, "MJPG", 300, 1),
+    "1080p_mp4v": (1920, 1080, "mp4v", 300, None),
+    "1080p_h264_gop250": (1920, 1080, "h264", 600, 250),
+}
+QUICK_VIDEOS = ("480p_mp4v", "480p_mjpg")
+
+
+# --- Vídeos sintéticos ---
+def _synthetic_frames(width, height, count, seed=0):
+    # textura fixa deslizando 4 px por frame: o encoder não vê "cortes" e mantém o GOP
+    rng = np.random.default_rng(seed)
+    texture = cv2.resize(rng.integers(0, 255, (height // 8, width // 8 + count, 3), dtype=np.uint8),
+                         (width + count * 8, height), interpolation=cv2.INTER_LINEAR)
+    for n in range(count):
+        offset = (n * 4) % (texture.shape[1] - width)
+        frame = np.ascontiguousarray(texture[:, offset:offset + width])
+        cv2.putText(frame, str(n), (20, height // 4), cv2.FONT_HERSHEY_SIMPLEX, height / 240, (255, 255, 255), 3)
+        yield frame
+
+
+def _write_opencv(path, width, height, codec, count):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), 30, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"codec {codec} indisponível no OpenCV")
+    try:
+        for frame in _synthetic_frames(width, height, count):
+            writer.write(frame)
+    finally:
+        writer.release()
+
+
+def _write_pyav(path, width, height, count, gop):
+    with av.open(path, "w") as container:
+        stream = container.add_stream("libx264", rate=30)
+        stream.width, stream.height, stream.pix_fmt = width, height, "yuv420p"
+        stream.codec_context.gop_size = gop
+        stream.options = {"preset": "veryfast", "bf": "2", "sc_threshold": "0"}
+        for n, frame in enumerate(_synthetic_frames(width, height, count)):
+            img = av.VideoFrame.from_ndarray(frame, format="bgr24")
+            img.pts, img.time_base = n, Fraction(1, 30)
+            for packet in stream.encode(img):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+
+
+def make_video(workdir, name):
+    """Caminho do vídeo sintético `name`, gerado só na primeira vez"""
+    width, height, codec, count, gop = VIDEOS[name]
+    path = os.path.join(workdir, name + (".avi" if codec == "MJPG" else ".mp4"))
+    if not os.path.exists(path):
+        tmp = path + ".part" + os.path.splitext(path)[1]
+        if codec == "h264":
+            if av is None:
+                raise RuntimeError("PyAV não instalado")
+            _write_pyav(tmp, width, height, count, gop)
+        else:
+            _write_opencv(tmp, width, height, codec, count)
+        os.replace(tmp, path)
+    return path
+
+
+# --- Medições ---
+def _ms(samples):
+    samples = np.asarray(samples) * 1000.0
+    return {"p50_ms": float(np.percentile(samples, 50)), "p95_ms": float(np.percentile(samples, 95))}
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def _fresh_navigator(path, index, backend=None):
+    return FrameNavigator(open_source(path, index, backend=backend))
+
+
+def bench_frame_count(path):
+    build_time, _ = _timed(build_index, path)
+    load_or_build_index(path)  # grava o arquivo lateral
+    # o índice devolvido é o dos apps (com video_hash), para a exportação usar os caches de verdade
+    reopen_time, index = _timed(load_or_build_index, path)
+    return index, {"index_build_ms": build_time * 1000.0, "index_reopen_ms": reopen_time * 1000.0}
+
+
+def bench_navigation(path, index, samples, seed=0, backend=None):
+    """Latências no caminho do show_frame (decodificar + preparar a imagem de exibição)"""
+    rng = random.Random(seed)
+    total = index.frame_count
+    renderer = FrameRenderer()
+    results = {}
+
+    def show(navigator, n, preview=False):
+        started = time.perf_counter()
+        frame = navigator.get_preview(n) if preview else navigator.get(n)
+        renderer.render(frame, preview)
+        return time.perf_counter() - started
+
+    navigator = _fresh_navigator(path, index, backend)
+    try:
+        show(navigator, 0)  # abre o decoder fora da medição
+        results["random_seek"] = _ms([show(navigator, rng.randrange(total)) for _ in range(samples)])
+    finally:
+        navigator.close()
+
+    navigator = _fresh_navigator(path, index, backend)
+    try:
+        start = total // 3
+        show(navigator, start)
+        results["step_forward"] = _ms([show(navigator, n) for n in range(start + 1, min(start + 1 + samples, total))])
+    finally:
+        navigator.close()
+
+    navigator = _fresh_navigator(path, index, backend)
+    try:
+        start = min(total - 1, total // 3 + samples)
+        show(navigator, start)
+        results["step_backward"] = _ms([show(navigator, n) for n in range(start - 1, max(start - 1 - samples, -1), -1)])
+    finally:
+        navigator.close()
+
+    navigator = _fresh_navigator(path, index, backend)
+    try:
+        # arrastar o slider: posições espalhadas pelo vídeo, prévia rápida
+        positions = [int(i * (total - 1) / max(samples - 1, 1)) for i in range(samples)]
+        results["scrub_preview"] = _ms([show(navigator, n, preview=True) for n in positions])
+    finally:
+        navigator.close()
+    return results
+
+
+def _annotations(index, notes):
+    step = max(index.frame_count // notes, 1)
+    return {f: f"Observação sintética do frame {f}" for f in range(0, index.frame_count, step)[:notes]}
+
+
+def _isolated_cache(workdir):
+    # miniaturas sempre frias: cada execução de exportação usa um cache novo
+    cache = tempfile.mkdtemp(prefix="cache-", dir=workdir)
+    os.environ["J1NX_CACHE_DIR"] = cache
+    return cache
+
+
+def _export_desktop(path, index, annotations, out_dir):
+    # mesmo caminho do export_csv/export_pdf do app desktop
+    write_csv(os.path.join(out_dir, "bench.csv"), annotations, "Comentário global")
+    thumbs = ThumbnailStore(index.video_hash)
+    try:
+        for f, data in extract_thumbnails(path, index, thumbs.missing(annotations), size=thumbs.size):
+            thumbs.put_bytes(f, data)
+        write_pdf(os.path.join(out_dir, "bench.pdf"), annotations, "Comentário global", thumbs,
+                  volume_size=VOLUME_SIZE)
+    finally:
+        thumbs.close()
+
+
+def _streamlit_namespace():
+    """Funções do app Streamlit (executado em modo "bare", sem servidor)"""
+    from streamlit import logger
+    logger.set_log_level("error")
+    return runpy.run_path(os.path.join(HERE, "versãodestreamlit.py"), run_name="benchmark")
+
+
+def _export_streamlit(ns, path, index, annotations):
+    ns["thumbnail_store"].clear()
+    video = types.SimpleNamespace(path=path, index=index, content_hash=index.video_hash)
+    items = tuple(sorted(annotations.items()))
+    ns["build_csv_report"](items, "Comentário global")
+    ns["build_pdf_report"](video, items, "Comentário global")
+
+
+def _measure(workdir, fn, *args):
+    """(segundos, pico de memória em MB): tempo sem tracemalloc, memória numa segunda execução"""
+    cache = _isolated_cache(workdir)
+    try:
+        seconds, _ = _timed(fn, *args)
+    finally:
+        shutil.rmtree(cache, ignore_errors=True)
+    cache = _isolated_cache(workdir)
+    tracemalloc.start()
+    try:
+        fn(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        shutil.rmtree(cache, ignore_errors=True)
+    return seconds, peak / (1024 * 1024)
+
+
+def bench_exports(workdir, path, index, notes, streamlit_ns):
+    annotations = _annotations(index, notes)
+    out_dir = tempfile.mkdtemp(prefix="out-", dir=workdir)
+    saved_cache = os.environ.get("J1NX_CACHE_DIR")
+    results = {}
+    try:
+        seconds, peak = _measure(workdir, _export_desktop, path, index, annotations, out_dir)
+        results["export_desktop"] = {"time_ms": seconds * 1000.0, "peak_mb": peak}
+        if streamlit_ns is not None:
+            seconds, peak = _measure(workdir, _export_streamlit, streamlit_ns, path, index, annotations)
+            results["export_streamlit"] = {"time_ms": seconds * 1000.0, "peak_mb": peak}
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        if saved_cache is None:
+            os.environ.pop("J1NX_CACHE_DIR", None)
+        else:
+            os.environ["J1NX_CACHE_DIR"] = saved_cache
+    return results
+
+
+def run(names, workdir, samples, notes, with_streamlit=True, backends=()):
+    os.makedirs(workdir, exist_ok=True)
+    streamlit_ns = None
+    if with_streamlit:
+        try:
+            streamlit_ns = _streamlit_namespace()
+        except Exception as e:
+            print(f"Streamlit indisponível, exportação do Streamlit não medida ({e})", file=sys.stderr)
+
+    usable = available_backends()
+    for backend in backends:
+        if backend not in usable:
+            print(f"backend {backend} indisponível nesta instalação: não medido", file=sys.stderr)
+    backends = [b for b in backends if b in usable]
+
+    results, chosen = {}, {}
+    for name in names:
+        try:
+            path = make_video(workdir, name)
+        except RuntimeError as e:
+            print(f"{name}: pulado ({e})", file=sys.stderr)
+            continue
+        print(f"{name}...", file=sys.stderr)
+        # índice e sidecars num cache próprio da execução, para a contagem começar fria
+        cache = _isolated_cache(workdir)
+        try:
+            index, metrics = bench_frame_count(path)
+            metrics.update(bench_navigation(path, index, samples))
+            chosen[name] = choose_backend(path)
+            for backend in backends:
+                for metric, value in bench_navigation(path, index, samples, backend=backend).items():
+                    metrics[f"{metric}@{backend}"] = value
+        finally:
+            shutil.rmtree(cache, ignore_errors=True)
+            os.environ.pop("J1NX_CACHE_DIR", None)
+        metrics.update(bench_exports(workdir, path, index, notes, streamlit_ns))
+        results[name] = metrics
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "pyav": getattr(av, "__version__", None),
+            "backend": chosen,  # backend automático de cada vídeo (nas métricas sem @)
+            "machine": platform.platform(),
+            "cpus": os.cpu_count(),
+            "samples": samples,
+            "notes": notes,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+# --- Comparação com a linha de base ---
+def flatten(results):
+    """{"vídeo/métrica/campo": valor}"""
+    flat = {}
+    for video, metrics in results.items():
+        for metric, value in metrics.items():
+            if isinstance(value, dict):
+                for field, v in value.items():
+                    flat[f"{video}/{metric}/{field}"] = v
+            else:
+                flat[f"{video}/{metric}"] = value
+    return flat
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """[(métrica, base, atual, variação)] das regressões além do limite"""
+    base = flatten(baseline["results"])
+    regressions = []
+    for key, value in sorted(flatten(current["results"]).items()):
+        if key not in base:
+            continue
+        limit = max(base[key] * (1 + threshold), base[key] + MIN_DELTA)
+        if value > limit:
+            regressions.append((key, base[key], value, value / base[key] - 1 if base[key] else float("inf")))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python benchmark.py", description="Benchmarks de navegação e exportação.")
+    parser.add_argument("--videos", nargs="+", choices=sorted(VIDEOS), help="vídeos sintéticos (padrão: todos)")
+    parser.add_argument("--quick", action="store_true", help=f"só {', '.join(QUICK_VIDEOS)}")
+    parser.add_argument("--samples", type=int, default=60, help="medições por métrica de navegação")
+    parser.add_argument("--notes", type=int, default=40, help="anotações nos relatórios exportados")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR, help="onde ficam os vídeos gerados")
+    parser.add_argument("--out", default="benchmark_results.json", help="arquivo JSON de resultados")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="linha de base para comparar")
+    parser.add_argument("--save-baseline", action="store_true", help="grava os resultados como nova linha de base")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="regressão tolerada (0.25 = 25%%)")
+    parser.add_argument("--no-streamlit", action="store_true", help="não mede a exportação do Streamlit")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=[],
+                        help="mede a navegação também com estes backends de decodificação")
+    args = parser.parse_args(argv)
+
+    names = args.videos or (list(QUICK_VIDEOS) if args.quick else list(VIDEOS))
+    report = run(names, args.workdir, args.samples, args.notes, not args.no_streamlit, args.backends)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    for key, value in flatten(report["results"]).items():
+        print(f"{key:<50} {value:10.2f}")
+    print(f"Resultados em {args.out}")
+
+    if args.save_baseline:
+        shutil.copyfile(args.out, args.baseline)
+        print(f"Linha de base gravada em {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"Comparação PULADA: {args.baseline} não existe. Rode primeiro "
+              "`python benchmark.py --save-baseline` nesta máquina.")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(report, json.load(f), args.threshold)
+    for key, base, value, change in regressions:
+        print(f"REGRESSÃO {key}: {base:.2f} -> {value:.2f} (+{change:.0%})", file=sys.stderr)
+    print(f"{len(regressions)} regressão(ões) acima de {args.threshold:.0%}.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Conversão de frames para exibição sem alocações por frame.
+
+O frame BGR é primeiro reduzido com `cv2.resize` (INTER_AREA, ou vizinho mais
+próximo nas prévias) para um buffer pré-alocado no tamanho de exibição, e só
+então convertido para RGBA, ou seja, a conversão de cor trabalha no buffer
+pequeno independente da resolução do vídeo. O resultado é copiado para uma
+imagem PIL em bloco contíguo, que o `PhotoImage.paste` do Tk aceita sem cópia
+intermediária. Os buffers só são recriados quando o tamanho de exibição muda.
+"""
+import threading
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import perf
+
+DEFAULT_SIZE = (640, 360)
+MIN_SIZE = (160, 90)
+
+
+def fit_size(width, height, max_width, max_height):
+    """Maior tamanho que cabe em max_width x max_height mantendo a proporção (sem ampliar)"""
+    scale = min(max_width / width, max_height / height, 1.0)
+    return max(int(width * scale), 1), max(int(height * scale), 1)
+
+
+def _blittable_image(size):
+    # imagem num bloco contíguo: o PhotoImage.paste copia direto, sem converter para outro bloco
+    try:
+        return Image.new("RGBA", (1, 1))._new(Image.core.new_block("RGBA", size))
+    except AttributeError:
+        return Image.new("RGBA", size)
+
+
+class FrameRenderer:
+    """Reduz e converte frames BGR em imagens PIL reaproveitadas.
+
+    Com buffers > 1 as imagens formam um anel: a que está sendo exibida (marcada
+    com `reading`) e a última entregue nunca são sobrescritas, então uma thread
+    pode renderizar enquanto a interface cola o resultado anterior.
+    """
+
+    def __init__(self, size=DEFAULT_SIZE, buffers=1):
+        self.size = size
+        self._count = buffers
+        self._lock = threading.Lock()
+        self._shape = None
+        self._slots = []
+        self._last = -1
+        self._reading = None
+
+    def set_size(self, width, height):
+        self.size = (max(int(width), MIN_SIZE[0]), max(int(height), MIN_SIZE[1]))
+
+    def _allocate(self, shape):
+        width, height = shape
+        self._shape = shape
+        self._slots = [
+            (np.empty((height, width, 3), dtype=np.uint8),
+             np.empty((height, width, 4), dtype=np.uint8),
+             _blittable_image(shape))
+            for _ in range(self._count)
+        ]
+        self._last = -1
+
+    def render(self, frame, preview=False):
+        """Frame BGR -> imagem PIL RGBA no tamanho de exibição (válida até ser reaproveitada)"""
+        h, w = frame.shape[:2]
+        shape = fit_size(w, h, *self.size)
+        with self._lock:
+            if shape != self._shape:
+                self._allocate(shape)
+            i = (self._last + 1) % self._count
+            if i == self._reading:
+                i = (i + 1) % self._count
+            small, rgba, img = self._slots[i]
+        if shape != (w, h):
+            interpolation = cv2.INTER_NEAREST if preview else cv2.INTER_AREA
+            with perf.stage("resize"):
+                cv2.resize(frame, shape, dst=small, interpolation=interpolation)
+            frame = small
+        with perf.stage("cvtColor"):
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA, dst=rgba)
+        with perf.stage("to_pil"):
+            img.frombytes(rgba)
+        with self._lock:
+            self._last = i
+        return img
+
+    @contextmanager
+    def reading(self, img):
+        """Protege `img` de ser sobrescrita enquanto a interface a usa"""
+        with self._lock:
+            self._reading = next((i for i, slot in enumerate(self._slots) if slot[2] is img), None)
+        try:
+            yield img
+        finally:
+            with self._lock:
+                self._reading = None
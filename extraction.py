@@ -0,0 +1,81 @@
+"""Extração de miniaturas em uma passada, em paralelo, para a exportação de PDF.
+
+Os frames-alvo são ordenados e agrupados por GOP; os grupos viram segmentos
+contíguos alinhados a keyframes, e cada segmento é decodificado num processo
+do pool com uma única passada para frente (`FrameSource.read_many`, com uma
+thread de decodificação por processo: o paralelismo já está no pool). O
+resultado volta em ordem de frame como bytes JPEG já reduzidos, prontos para o
+ReportLab.
+
+O pool usa processos "spawn": os apps chamam daqui com threads de decodificação,
+pré-busca e gravação rodando, e um fork copiaria travas que elas seguram.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from frame_source import choose_backend, open_source
+from thumb_store import THUMB_SIZE, encode_thumbnail
+
+# abaixo disso o custo de subir processos não compensa
+MIN_FRAMES_FOR_POOL = 16
+
+_worker_state = {}
+
+
+def plan_segments(index, frame_numbers, segments):
+    """Divide os frames (ordenados) em até `segments` blocos que começam em keyframes"""
+    frames = sorted(set(frame_numbers))
+    groups = []
+    for f in frames:
+        keyframe = index.keyframe_before(f)
+        if groups and groups[-1][0] == keyframe:
+            groups[-1][1].append(f)
+        else:
+            groups.append((keyframe, [f]))
+
+    # junta GOPs vizinhos até ~len(frames)/segments alvos por bloco
+    per_segment = max(1, -(-len(frames) // max(segments, 1)))
+    planned, current = [], []
+    for _, group in groups:
+        current.extend(group)
+        if len(current) >= per_segment:
+            planned.append(current)
+            current = []
+    if current:
+        planned.append(current)
+    return planned
+
+
+def _init_worker(path, index, backend):
+    _worker_state["source"] = open_source(path, index, backend=backend, threads=1)
+
+
+def _extract_segment(frames, size, quality, source=None):
+    source = source or _worker_state["source"]
+    return [(f, encode_thumbnail(frame, size, quality=quality)) for f, frame in source.read_many(frames)]
+
+
+def default_workers():
+    return max(1, min(os.cpu_count() or 1, 8))
+
+
+def extract_thumbnails(path, index, frame_numbers, size=THUMB_SIZE, quality=85, workers=None, backend=None):
+    """Lista [(frame, bytes JPEG)] em ordem de frame para os frames pedidos"""
+    frames = sorted(set(frame_numbers))
+    if not frames:
+        return []
+    workers = workers or default_workers()
+    backend = backend or choose_backend(path)
+
+    if workers == 1 or len(frames) < MIN_FRAMES_FOR_POOL:
+        with open_source(path, index, backend=backend) as source:
+            return _extract_segment(frames, size, quality, source=source)
+
+    segments = plan_segments(index, frames, workers * 2)
+    results = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(segments)), mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(path, index, backend)) as pool:
+        for part in pool.map(_extract_segment, segments, [size] * len(segments), [quality] * len(segments)):
+            results.extend(part)
+    return results
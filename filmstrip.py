@@ -0,0 +1,230 @@
+"""Tira de miniaturas (filmstrip) da linha do tempo para orientar a navegação.
+
+As miniaturas são espaçadas igualmente ao longo do vídeo e alinhadas a
+keyframes, então cada uma custa uma única decodificação. Uma thread de fundo
+as constrói aos poucos com uma `FrameSource` própria (que pula frames com
+`grab()` quando o próximo alvo está perto) e as guarda num `ThumbnailStore`, de modo
+que reabrir o vídeo mostra a tira na hora. Passar o mouse sobre a tira ou o
+slider mostra a miniatura mais próxima, vinda do cache e não do decoder. Os
+trechos anotados aparecem como faixas sobre a tira.
+"""
+import bisect
+import queue
+import threading
+import tkinter as tk
+
+from PIL import ImageTk
+
+from frame_source import open_source
+from thumb_store import ThumbnailStore
+
+DEFAULT_TILES = 48
+TILE_SIZE = (160, 90)
+RANGE_COLOR = "#ff9f1a"
+RANGE_BAR_HEIGHT = 6
+
+
+def filmstrip_frames(index, count=DEFAULT_TILES):
+    """Frames igualmente espaçados, alinhados ao keyframe anterior quando conhecido"""
+    total = index.frame_count
+    if total <= 0:
+        return []
+    count = min(count, total)
+    targets = [round(i * (total - 1) / max(count - 1, 1)) for i in range(count)]
+    if len(index.keyframes):
+        targets = [index.keyframe_before(t) for t in targets]
+    return sorted(set(targets))
+
+
+class FilmstripBuilder:
+    """Gera as miniaturas da tira em segundo plano; os frames prontos saem em `results`.
+
+    Depois de `stop()` o store passa a ser deste objeto: é fechado aqui mesmo
+    ou, se a thread ainda estiver lendo, por ela ao sair.
+    """
+
+    def __init__(self, path, index, store, count=DEFAULT_TILES):
+        self.path = path
+        self.index = index
+        self.store = store
+        self.frames = filmstrip_frames(index, count)
+        self.results = queue.Queue()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._done = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def _run(self):
+        try:
+            self._build()
+        finally:
+            with self._lock:
+                self._done = True
+                if self._stop.is_set():
+                    self.store.close()
+
+    def _build(self):
+        todo = []
+        for f in self.frames:
+            if f in self.store:
+                self.results.put(f)  # já em cache de uma abertura anterior
+            else:
+                todo.append(f)
+        if not todo:
+            return
+
+        with open_source(self.path, self.index, threads=1) as source:
+            for f, frame in source.read_many(todo):
+                # a leitura pode ter demorado: stop() pode ter chegado no meio dela
+                if self._stop.is_set():
+                    break
+                self.store.put(f, frame)
+                self.results.put(f)
+
+    def stop(self):
+        """Para a geração e fecha o store (sem esperar por uma leitura lenta)"""
+        with self._lock:
+            self._stop.set()
+            if self._done:
+                self.store.close()
+
+
+class Filmstrip(tk.Canvas):
+    """Canvas com a tira de miniaturas; clique chama on_select(frame)"""
+
+    def __init__(self, master, on_select=None, height=54, **kwargs):
+        super().__init__(master, height=height, highlightthickness=0, bg="#1d1e1e", **kwargs)
+        self.on_select = on_select
+        self.total_frames = 0
+        self.builder = None
+        self.store = None
+        self._tiles = []  # frames prontos, ordenados
+        self._ranges = []  # (início, fim) dos trechos anotados
+        self._photos = []
+        self._poll_job = None
+        self._hover = None
+
+        self.bind("<Configure>", lambda e: self.redraw())
+        self.bind("<Motion>", lambda e: self.hover_fraction(e.x / max(self.winfo_width(), 1), e.x_root, e.y_root))
+        self.bind("<Leave>", lambda e: self.hide_hover())
+        self.bind("<Button-1>", self._clicked)
+
+    def load(self, path, index):
+        """Começa (ou retoma do cache) a tira de um novo vídeo"""
+        self.close()
+        self.total_frames = index.frame_count
+        self.store = ThumbnailStore(index.video_hash, size=TILE_SIZE)
+        self.builder = FilmstripBuilder(path, index, self.store)
+        self._tiles = []
+        self.redraw()
+        self._poll()
+
+    def _poll(self):
+        self._poll_job = None
+        changed = False
+        while True:
+            try:
+                f = self.builder.results.get_nowait()
+            except queue.Empty:
+                break
+            bisect.insort(self._tiles, f)
+            changed = True
+        if changed:
+            self.redraw()
+        if self.builder.running or not self.builder.results.empty():
+            self._poll_job = self.after(100, self._poll)
+
+    def redraw(self):
+        self.delete("all")
+        self._photos = []
+        width, height = self.winfo_width(), int(self["height"])
+        if not self._tiles or width <= 1 or self.total_frames <= 0:
+            self._draw_ranges()
+            return
+        tile_w = max(width // max(len(self.builder.frames), 1), 1)
+        for f in self._tiles:
+            img = self.store.get_image(f)
+            if img is None:
+                continue
+            photo = ImageTk.PhotoImage(img.resize((tile_w, height)))
+            self._photos.append(photo)
+            self.create_image(int(f / self.total_frames * width), 0, image=photo, anchor="nw")
+        self._draw_ranges()
+
+    # --- Trechos anotados ---
+    def set_ranges(self, ranges):
+        """ranges: [(início, fim, ...)]; desenhados como faixas na base da tira"""
+        self._ranges = [(r[0], r[1]) for r in ranges]
+        self.delete("ranges")
+        self._draw_ranges()
+
+    def _draw_ranges(self):
+        width, height = self.winfo_width(), int(self["height"])
+        if width <= 1 or self.total_frames <= 0:
+            return
+        # trechos sobrepostos empilham em faixas para continuarem distinguíveis
+        lanes = []
+        for start, end in sorted(self._ranges):
+            lane = next((i for i, last in enumerate(lanes) if last < start), len(lanes))
+            if lane == len(lanes):
+                lanes.append(end)
+            else:
+                lanes[lane] = end
+            lane = min(lane, height // RANGE_BAR_HEIGHT - 1)  # sem sair da tira
+            y = height - (lane + 1) * RANGE_BAR_HEIGHT
+            x0 = int(start / self.total_frames * width)
+            x1 = max(int((end + 1) / self.total_frames * width), x0 + 2)
+            self.create_rectangle(x0, y, x1, y + RANGE_BAR_HEIGHT - 1, fill=RANGE_COLOR, width=0, tags="ranges")
+
+    # --- Prévia ao passar o mouse ---
+    def nearest_tile(self, frame_number):
+        if not self._tiles:
+            return None
+        i = bisect.bisect_left(self._tiles, frame_number)
+        candidates = self._tiles[max(i - 1, 0):i + 1]
+        return min(candidates, key=lambda f: abs(f - frame_number))
+
+    def hover_fraction(self, fraction, x_root, y_root):
+        """Mostra a miniatura mais próxima da posição (0..1) da linha do tempo"""
+        tile = self.nearest_tile(int(min(max(fraction, 0.0), 1.0) * max(self.total_frames - 1, 0)))
+        if tile is None:
+            return
+        img = self.store.get_image(tile)
+        if img is None:
+            return
+        if self._hover is None:
+            self._hover = tk.Toplevel(self)
+            self._hover.overrideredirect(True)
+            self._hover_label = tk.Label(self._hover, compound="top", bg="#1d1e1e", fg="white")
+            self._hover_label.pack()
+        photo = ImageTk.PhotoImage(img)
+        self._hover_label.configure(image=photo, text=f"≈ frame {tile + 1}")
+        self._hover_label.image = photo
+        self._hover.geometry(f"+{x_root - img.width // 2}+{y_root - img.height - 40}")
+        self._hover.deiconify()
+
+    def hide_hover(self):
+        if self._hover is not None:
+            self._hover.withdraw()
+
+    def _clicked(self, event):
+        if self.on_select and self.total_frames > 0:
+            tile = self.nearest_tile(int(event.x / max(self.winfo_width(), 1) * (self.total_frames - 1)))
+            if tile is not None:
+                self.on_select(tile)
+
+    def close(self):
+        if self._poll_job:
+            self.after_cancel(self._poll_job)
+            self._poll_job = None
+        if self.builder:
+            self.builder.stop()  # fecha o store agora ou quando a thread sair
+            self.builder = None
+        elif self.store:
+            self.store.close()
+        self.store = None
@@ -0,0 +1,251 @@
+"""Índice persistente de frames (keyframes, PTS e contagem exata) por vídeo.
+
+O índice é construído uma única vez lendo apenas os pacotes do stream de vídeo
+(sem decodificar pixels) e salvo em um arquivo lateral (.npz) no diretório de
+cache, identificado pelo hash do conteúdo do arquivo. Assim, reabrir o mesmo
+vídeo é instantâneo e toda busca (feita pela `FrameSource`, em frame_source.py)
+vai para o keyframe mais próximo e decodifica para frente apenas os frames
+necessários.
+"""
+import bisect
+import hashlib
+import os
+import subprocess
+
+import cv2
+import numpy as np
+
+
+try:
+    import av  # PyAV (opcional): leitura de pacotes sem depender do ffprobe
+except ImportError:
+    av = None
+
+INDEX_VERSION = 2  # 2: grava o método de varredura (`scanner`)
+_HASH_BLOCK = 1 << 20  # 1 MB
+_HASH_SAMPLES = 16
+
+
+# =============== CACHE E HASH ===============
+def cache_dir(*parts):
+    """Diretório de cache do projeto (J1NX_CACHE_DIR ou ~/.cache/j1nx)"""
+    base = os.environ.get("J1NX_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "j1nx")
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def video_hash(path):
+    """Hash do conteúdo do vídeo.
+
+    Para não ler arquivos de vários GB inteiros, usa o tamanho do arquivo mais
+    blocos de 1 MB do início, do fim e de posições igualmente espaçadas.
+    """
+    size = os.path.getsize(path)
+    h = hashlib.sha1(str(size).encode())
+    with open(path, "rb") as f:
+        if size <= _HASH_BLOCK * (_HASH_SAMPLES + 2):
+            h.update(f.read())
+        else:
+            step = (size - _HASH_BLOCK) // (_HASH_SAMPLES + 1)
+            for i in range(_HASH_SAMPLES + 2):
+                f.seek(min(i * step, size - _HASH_BLOCK))
+                h.update(f.read(_HASH_BLOCK))
+    return h.hexdigest()
+
+
+# =============== ÍNDICE ===============
+class FrameIndex:
+    """PTS de cada frame (ordem de exibição) e posições dos keyframes.
+
+    `scanner` diz como o índice foi montado ("pyav", "ffprobe" ou "opencv"):
+    só os dois primeiros têm PTS no time_base do stream; o do OpenCV guarda
+    milissegundos e nenhum keyframe.
+    """
+
+    def __init__(self, pts, keyframes, fps, time_base, video_hash=None, scanner="pyav"):
+        self.pts = np.asarray(pts, dtype=np.int64)
+        self.keyframes = np.asarray(keyframes, dtype=np.int64)
+        self.fps = float(fps) if fps else 0.0
+        self.time_base = float(time_base)
+        self.video_hash = video_hash
+        self.scanner = scanner
+
+    @property
+    def stream_pts(self):
+        """True se os PTS estão no time_base do stream (busca por PTS é possível)"""
+        return self.scanner != "opencv"
+
+    @property
+    def frame_count(self):
+        return int(len(self.pts))
+
+    def keyframe_before(self, frame_number):
+        """Keyframe mais próximo em ou antes de frame_number (0 se desconhecido)"""
+        if not len(self.keyframes):
+            return 0
+        i = bisect.bisect_right(self.keyframes, frame_number) - 1
+        return int(self.keyframes[max(i, 0)])
+
+    def gop_bounds(self, frame_number):
+        """Intervalo [início, fim) do GOP que contém frame_number"""
+        start = self.keyframe_before(frame_number)
+        i = bisect.bisect_right(self.keyframes, frame_number)
+        end = int(self.keyframes[i]) if i < len(self.keyframes) else self.frame_count
+        return start, end
+
+    def timestamp(self, frame_number):
+        """Tempo de apresentação do frame em segundos"""
+        return float(self.pts[frame_number] - self.pts[0]) * self.time_base
+
+    def frame_at(self, seconds):
+        """Último frame cujo tempo de apresentação é <= seconds"""
+        target = self.pts[0] + int(seconds / self.time_base)
+        i = int(np.searchsorted(self.pts, target, side="right")) - 1
+        return min(max(i, 0), self.frame_count - 1)
+
+    # --- Persistência ---
+    def save(self, path):
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp,
+            version=INDEX_VERSION,
+            pts=self.pts,
+            keyframes=self.keyframes,
+            fps=self.fps,
+            time_base=self.time_base,
+            scanner=self.scanner,
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, video_hash=None):
+        with np.load(path) as data:
+            if int(data["version"]) != INDEX_VERSION:
+                raise ValueError("Versão de índice incompatível")
+            return cls(data["pts"], data["keyframes"], float(data["fps"]), float(data["time_base"]),
+                       video_hash, str(data["scanner"]))
+
+
+def _scan_with_pyav(path):
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        pts, key_pts = [], []
+        for packet in container.demux(stream):
+            if packet.size == 0:  # pacote de flush
+                continue
+            p = packet.pts if packet.pts is not None else packet.dts
+            if p is None:
+                p = len(pts)
+            pts.append(p)
+            if packet.is_keyframe:
+                key_pts.append(p)
+        fps = float(stream.average_rate or stream.guessed_rate or 0)
+        return pts, key_pts, fps, float(stream.time_base)
+
+
+def _probe_stream(path):
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "stream=time_base,avg_frame_rate", "-of", "csv=p=0", path,
+    ]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.decode("utf-8", "replace"))
+    fields = proc.stdout.decode().strip().splitlines()[0].split(",")
+    num, den = (int(x) for x in fields[0].split("/"))
+    rate_num, rate_den = (int(x) for x in fields[1].split("/"))
+    return num / den, (rate_num / rate_den if rate_den else 0.0)
+
+
+def _scan_with_ffprobe(path):
+    time_base, fps = _probe_stream(path)
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts,dts,flags", "-of", "csv=p=0", path,
+    ]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.decode("utf-8", "replace"))
+    pts, key_pts = [], []
+    for line in proc.stdout.decode().splitlines():
+        fields = line.split(",")
+        if len(fields) < 3:
+            continue
+        p = fields[0] if fields[0] not in ("", "N/A") else fields[1]
+        p = int(p) if p not in ("", "N/A") else len(pts)
+        pts.append(p)
+        if "K" in fields[2]:
+            key_pts.append(p)
+    return pts, key_pts, fps, time_base
+
+
+def _scan_with_opencv(path):
+    # Último recurso: grab() avança sem converter pixels, mas ainda decodifica.
+    # Keyframes ficam desconhecidos e as buscas voltam a usar CAP_PROP_POS_FRAMES.
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    pts = []
+    while cap.grab():
+        pts.append(int(round(cap.get(cv2.CAP_PROP_POS_MSEC))))
+    cap.release()
+    return pts, [], fps, 1e-3
+
+
+def _ffprobe_available():
+    try:
+        proc = subprocess.run(["ffprobe", "-version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return proc.returncode == 0
+    except FileNotFoundError:
+        return False
+
+
+def _scanners():
+    # do mais preciso para o último recurso
+    scanners = []
+    if av is not None:
+        scanners.append(("pyav", _scan_with_pyav))
+    if _ffprobe_available():
+        scanners.append(("ffprobe", _scan_with_ffprobe))
+    scanners.append(("opencv", _scan_with_opencv))
+    return scanners
+
+
+def build_index(path, video_hash=None):
+    """Varre os pacotes do vídeo e monta o índice (sem decodificar pixels)"""
+    for name, scan in _scanners():
+        try:
+            pts, key_pts, fps, time_base = scan(path)
+            break
+        except Exception:
+            # contêiner que o demuxer não entende: tenta o próximo método
+            continue
+
+    # Pacotes chegam em ordem de decodificação; a ordem de exibição é a dos PTS
+    pts = np.sort(np.asarray(pts, dtype=np.int64))
+    keyframes = np.searchsorted(pts, np.sort(np.asarray(key_pts, dtype=np.int64)))
+    if len(keyframes) and keyframes[0] != 0:
+        keyframes = np.concatenate(([0], keyframes))
+    return FrameIndex(pts, np.unique(keyframes), fps, time_base, video_hash, name)
+
+
+def index_path(video_hash):
+    return os.path.join(cache_dir("index"), f"{video_hash}.npz")
+
+
+def load_or_build_index(path, video_hash_value=None):
+    """Carrega o índice lateral do vídeo ou o constrói e salva na primeira abertura"""
+    vh = video_hash_value or video_hash(path)
+    sidecar = index_path(vh)
+    if os.path.exists(sidecar):
+        try:
+            index = FrameIndex.load(sidecar, vh)
+            # índice do fallback do OpenCV e agora há PyAV ou ffprobe: refaz com PTS e keyframes
+            if index.stream_pts or len(_scanners()) == 1:
+                return index
+        except Exception:
+            pass  # índice corrompido ou de versão antiga: reconstrói
+    index = build_index(path, vh)
+    if index.frame_count > 0:
+        index.save(sidecar)
+    return index
@@ -0,0 +1,383 @@
+"""Leitura de frames com backends trocáveis: OpenCV, PyAV ou pipe do ffmpeg.
+
+Todo acesso a pixels do vídeo (navegação, miniaturas, filmstrip, análise de
+cortes) passa por uma `FrameSource`. A busca é exata em qualquer backend: vai
+ao keyframe anterior do `FrameIndex` e decodifica para frente, sem nova busca
+quando o alvo está adiante no mesmo GOP, e o número de frames vem do índice
+(PTS), não da estimativa do OpenCV. Cada backend aceita o número de threads do
+decoder e entrega BGR (ou RGB) já no tamanho pedido: no PyAV e no ffmpeg a
+redução e a conversão de cor saem numa única chamada do swscale.
+
+O backend vem de J1NX_BACKEND (opencv, pyav ou ffmpeg) ou, por padrão, do
+codec do vídeo (`CODEC_BACKENDS`, medido com `benchmark.py --backends`); o
+número de threads do decoder, de J1NX_THREADS (0 ou ausente = automático).
+"""
+import os
+import subprocess
+
+import cv2
+import numpy as np
+
+import perf
+from frame_index import load_or_build_index
+
+try:
+    import av  # PyAV (opcional): decodificação multithread sem processo externo
+except ImportError:
+    av = None
+
+BACKENDS = ("opencv", "pyav", "ffmpeg")
+# codecs em que o PyAV ganhou do OpenCV no `benchmark.py --backends` (busca
+# aleatória 2,5x mais rápida em H.264, 2,5x em MPEG-4 e 5x em MJPEG); os demais
+# ficam no OpenCV, assim como esses quando o PyAV não está instalado. O pipe do
+# ffmpeg (um processo novo por busca) só é usado quando pedido em J1NX_BACKEND
+CODEC_BACKENDS = {"h264": "pyav", "mpeg4": "pyav", "mjpeg": "pyav"}
+GRAB_SKIP_MAX = 48  # sem keyframes no índice: até esta distância, avança decodificando em vez de buscar
+
+
+class FrameSource:
+    """Frames de um vídeo por número, em BGR (ou RGB) no tamanho original ou em `size`.
+
+    `get(n)` reaproveita a posição do decoder: um passo para frente é uma
+    única leitura. `read_many` lê vários frames numa passada só. Não é
+    thread-safe: cada thread (ou processo) usa a sua.
+    """
+
+    backend = None
+    stages = ("seek", "grab", "read")  # nomes das etapas no perf
+
+    def __init__(self, path, index=None, threads=0, size=None, rgb=False):
+        self.path = path
+        self.index = index if index is not None else load_or_build_index(path)
+        self.threads = threads  # 0 = automático
+        self.size = size  # (largura, altura) exata da saída; None = original
+        self.rgb = rgb
+        self.position = None  # próximo frame que o decoder devolveria
+
+    @property
+    def frame_count(self):
+        return self.index.frame_count
+
+    @property
+    def fps(self):
+        return self.index.fps
+
+    # --- Primitivas de cada backend ---
+    def _seek(self, frame_number):
+        """Posiciona o decoder em frame_number ou antes dele (ajusta `position`)"""
+        raise NotImplementedError
+
+    def grab(self):
+        """Avança um frame sem converter pixels"""
+        raise NotImplementedError
+
+    def read(self):
+        """Próximo frame (ndarray) ou None no fim"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    # --- Busca exata ---
+    def _near(self, frame_number):
+        # adiante no mesmo GOP: decodificar até lá evita a busca. Se há um
+        # keyframe no caminho, buscar nele sai mais barato (em vídeo todo intra,
+        # como o proxy, é sempre assim)
+        if self.position is None or self.position > frame_number:
+            return False
+        if len(self.index.keyframes):
+            return self.index.keyframe_before(frame_number) <= self.position
+        # sem keyframes conhecidos (índice do fallback do OpenCV) não há como
+        # saber onde fica o GOP: só decodifica adiante se o alvo estiver perto
+        return frame_number - self.position <= GRAB_SKIP_MAX
+
+    def get(self, frame_number):
+        """Frame frame_number (ou None), buscando só quando necessário"""
+        seek, grab, read = self.stages
+        if not self._near(frame_number):
+            with perf.stage(seek):
+                self._seek(frame_number)
+            if self.position is None:
+                return None
+        if self.position < frame_number:
+            with perf.stage(grab):
+                while self.position < frame_number:
+                    if not self.grab():
+                        self.position = None
+                        return None
+        with perf.stage(read):
+            frame = self.read()
+        if frame is None:
+            self.position = None
+        return frame
+
+    def read_many(self, frame_numbers):
+        """Gera (frame, imagem) em ordem de frame, numa única passada para frente"""
+        for f in sorted(set(frame_numbers)):
+            frame = self.get(f)
+            if frame is not None:
+                yield f, frame
+
+    def _convert(self, frame):
+        # BGR no tamanho original -> tamanho e ordem de cores pedidos
+        if self.size is not None and (frame.shape[1], frame.shape[0]) != tuple(self.size):
+            frame = cv2.resize(frame, tuple(self.size), interpolation=cv2.INTER_AREA)
+        if self.rgb:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return frame
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class OpenCVSource(FrameSource):
+    """cv2.VideoCapture; a busca usa CAP_PROP_POS_FRAMES só em keyframes"""
+
+    backend = "opencv"
+    stages = ("cap.set", "cap.grab", "cap.read")
+
+    def __init__(self, path, index=None, threads=0, size=None, rgb=False):
+        super().__init__(path, index, threads, size, rgb)
+        api = cv2.CAP_FFMPEG if hasattr(cv2, "CAP_FFMPEG") else cv2.CAP_ANY
+        params = [cv2.CAP_PROP_N_THREADS, threads] if threads and hasattr(cv2, "CAP_PROP_N_THREADS") else []
+        self.cap = cv2.VideoCapture(path, api, params)
+        if not self.cap.isOpened():
+            self.cap = cv2.VideoCapture(path)
+        self.position = 0
+
+    def _seek(self, frame_number):
+        # sem keyframes conhecidos, volta a confiar em CAP_PROP_POS_FRAMES
+        target = self.index.keyframe_before(frame_number) if len(self.index.keyframes) else frame_number
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        self.position = target
+
+    def grab(self):
+        if not self.cap.grab():
+            return False
+        self.position += 1
+        return True
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        self.position += 1
+        return self._convert(frame)
+
+    def close(self):
+        self.cap.release()
+
+
+class PyAVSource(FrameSource):
+    """Decoder do FFmpeg via PyAV com threads por frame; o número de cada frame vem do seu PTS"""
+
+    backend = "pyav"
+    stages = ("av.seek", "av.grab", "av.read")
+
+    def __init__(self, path, index=None, threads=0, size=None, rgb=False):
+        super().__init__(path, index, threads, size, rgb)
+        self.container = av.open(path)
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = "AUTO"
+        if threads:
+            self.stream.thread_count = threads
+        self._format = "rgb24" if rgb else "bgr24"
+        self._decoder = self.container.decode(self.stream)
+        self._pending = None  # primeiro frame depois de uma busca (já decodificado)
+        self.position = 0
+
+    def _next(self):
+        if self._pending is not None:
+            frame, self._pending = self._pending, None
+            return frame
+        try:
+            return next(self._decoder)
+        except (StopIteration, av.error.EOFError):
+            return None
+
+    def _number(self, frame):
+        if frame.pts is None:
+            return self.position
+        return int(np.searchsorted(self.index.pts, frame.pts))
+
+    def _seek(self, frame_number):
+        keyframe = self.index.keyframe_before(frame_number)
+        self.container.seek(int(self.index.pts[keyframe]), stream=self.stream, backward=True)
+        self._decoder = self.container.decode(self.stream)
+        self._pending = None
+        first = self._next()
+        # a busca pode cair antes do keyframe pedido: o PTS diz onde estamos
+        self.position = None if first is None else self._number(first)
+        self._pending = first
+
+    def grab(self):
+        frame = self._next()
+        if frame is None:
+            return False
+        self.position = self._number(frame) + 1
+        return True
+
+    def read(self):
+        frame = self._next()
+        if frame is None:
+            return None
+        self.position = self._number(frame) + 1
+        if self.size is not None:
+            width, height = self.size
+            return frame.to_ndarray(format=self._format, width=width, height=height,
+                                    interpolation="AREA")
+        return frame.to_ndarray(format=self._format)
+
+    def close(self):
+        self.container.close()
+
+
+class FFmpegPipeSource(FrameSource):
+    """Processo ffmpeg que escreve frames crus no stdout; a busca reinicia o processo com -ss"""
+
+    backend = "ffmpeg"
+    stages = ("pipe.seek", "pipe.grab", "pipe.read")
+
+    def __init__(self, path, index=None, threads=0, size=None, rgb=False):
+        super().__init__(path, index, threads, size, rgb)
+        self.width, self.height = size or _probe_size(path)
+        self._frame_bytes = self.width * self.height * 3
+        self._scratch = bytearray(self._frame_bytes)
+        self._proc = None
+
+    def _start(self, frame_number):
+        self._stop()
+        cmd = ["ffmpeg", "-v", "error", "-nostdin"]
+        if self.threads:
+            cmd += ["-threads", str(self.threads)]
+        if frame_number > 0:
+            # busca precisa (o ffmpeg descarta os frames entre o keyframe e o
+            # alvo); a folga de 1 ms só compensa o arredondamento do timestamp
+            cmd += ["-ss", f"{max(self.index.timestamp(frame_number) - 0.001, 0):.6f}"]
+        cmd += [
+            "-i", self.path, "-map", "0:v:0", "-fps_mode", "passthrough",
+            "-vf", f"scale={self.width}:{self.height}:flags=area",
+            "-f", "rawvideo", "-pix_fmt", "rgb24" if self.rgb else "bgr24", "-",
+        ]
+        self._proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                      bufsize=self._frame_bytes)
+        self.position = frame_number
+
+    def _seek(self, frame_number):
+        self._start(frame_number)
+
+    def _read_into(self, buf):
+        if self._proc is None:
+            self._start(0)
+        view, filled = memoryview(buf), 0
+        while filled < len(buf):
+            n = self._proc.stdout.readinto(view[filled:])
+            if not n:
+                return False
+            filled += n
+        self.position += 1
+        return True
+
+    def grab(self):
+        return self._read_into(self._scratch)
+
+    def read(self):
+        frame = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        if not self._read_into(frame.data.cast("B")):
+            return None
+        return frame
+
+    def _stop(self):
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.stdout.close()
+            self._proc.wait()
+            self._proc = None
+
+    def close(self):
+        self._stop()
+
+
+_SOURCES = {"opencv": OpenCVSource, "pyav": PyAVSource, "ffmpeg": FFmpegPipeSource}
+
+
+def _ffmpeg_available():
+    try:
+        proc = subprocess.run(["ffmpeg", "-version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return proc.returncode == 0
+    except FileNotFoundError:
+        return False
+
+
+def _ffprobe_stream(path, entries):
+    cmd = ["ffprobe", "-v", "error", "-select_streams", "v:0",
+           "-show_entries", f"stream={entries}", "-of", "csv=p=0", path]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.decode("utf-8", "replace"))
+    return proc.stdout.decode().strip().splitlines()[0].split(",")
+
+
+def _probe_size(path):
+    if av is not None:
+        with av.open(path) as container:
+            stream = container.streams.video[0]
+            return stream.codec_context.width, stream.codec_context.height
+    width, height = _ffprobe_stream(path, "width,height")
+    return int(width), int(height)
+
+
+def video_codec(path):
+    """Nome do codec do stream de vídeo (h264, mpeg4...) ou None se não der para saber"""
+    try:
+        if av is not None:
+            with av.open(path) as container:
+                return container.streams.video[0].codec_context.name
+        return _ffprobe_stream(path, "codec_name")[0]
+    except Exception:
+        return None
+
+
+def available_backends():
+    """Backends utilizáveis nesta instalação"""
+    backends = ["opencv"]
+    if av is not None:
+        backends.append("pyav")
+    if _ffmpeg_available():
+        backends.append("ffmpeg")
+    return backends
+
+
+def choose_backend(path):
+    """Backend para este vídeo: J1NX_BACKEND ou a preferência do codec entre os instalados"""
+    backend = os.environ.get("J1NX_BACKEND") or CODEC_BACKENDS.get(video_codec(path), "opencv")
+    if backend == "pyav" and av is None:
+        backend = "opencv"
+    if backend == "ffmpeg" and not _ffmpeg_available():
+        backend = "opencv"
+    return backend if backend in _SOURCES else "opencv"
+
+
+def decoder_threads():
+    """Threads do decoder pedidas em J1NX_THREADS (0 = automático)"""
+    try:
+        return max(int(os.environ.get("J1NX_THREADS") or 0), 0)
+    except ValueError:
+        return 0
+
+
+def open_source(path, index=None, backend=None, threads=0, size=None, rgb=False):
+    """Abre o vídeo com o backend pedido (ou `choose_backend`) e `threads`
+    (ou `decoder_threads`); ver `FrameSource`"""
+    backend = backend or choose_backend(path)
+    threads = threads or decoder_threads()
+    if backend not in _SOURCES:
+        raise ValueError(f"Backend desconhecido: {backend} (use {', '.join(BACKENDS)})")
+    index = index if index is not None else load_or_build_index(path)
+    if backend == "pyav" and not index.stream_pts:
+        backend = "opencv"  # o PyAV busca por PTS do stream, que este índice não tem
+    return _SOURCES[backend](path, index, threads=threads, size=size, rgb=rgb)
@@ -0,0 +1,56 @@
+"""Índice de intervalos de frames para as anotações por trecho.
+
+Os intervalos ficam ordenados pelo início numa lista, vista como uma
+árvore binária de busca implícita (a raiz de cada faixa [lo, hi) é o meio):
+cada nó guarda o maior fim da sua subárvore. Uma consulta descarta subárvores
+inteiras cujo maior fim já passou ou cujo início está depois do alvo, então
+encontrar os k intervalos que cobrem um frame custa O((k + 1) log n) em vez
+de percorrer todas as anotações. O índice é imutável; quem altera os intervalos
+monta um novo (O(n log n), só na edição, nunca durante a navegação).
+"""
+
+
+class IntervalIndex:
+    """Intervalos fechados [início, fim] com uma chave cada; consulta por frame ou trecho"""
+
+    def __init__(self, intervals=()):
+        items = sorted((int(s), int(e), key) for s, e, key in intervals)
+        self._starts = [s for s, _, _ in items]
+        self._ends = [e for _, e, _ in items]
+        self._keys = [key for _, _, key in items]
+        self._max_end = list(self._ends)
+        self._build(0, len(items))
+
+    def _build(self, lo, hi):
+        # maior fim da subárvore [lo, hi), guardado na raiz (o meio); profundidade O(log n)
+        if lo >= hi:
+            return -1
+        mid = (lo + hi) // 2
+        m = max(self._ends[mid], self._build(lo, mid), self._build(mid + 1, hi))
+        self._max_end[mid] = m
+        return m
+
+    def __len__(self):
+        return len(self._keys)
+
+    def overlapping(self, start, end):
+        """Chaves dos intervalos que tocam [start, end], em ordem de início"""
+        found = []
+        stack = [(0, len(self._keys))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self._max_end[mid] < start:
+                continue  # nada nesta subárvore chega até o trecho
+            stack.append((lo, mid))
+            if self._starts[mid] <= end:
+                if self._ends[mid] >= start:
+                    found.append(mid)
+                stack.append((mid + 1, hi))  # à direita só há inícios maiores
+        return [self._keys[i] for i in sorted(found)]
+
+    def at(self, frame_number):
+        """Chaves dos intervalos que contêm frame_number, em ordem de início"""
+        return self.overlapping(frame_number, frame_number)
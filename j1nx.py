@@ -1,14 +1,34 @@
-import cv2
-from PIL import Image, ImageTk
+import sys
+
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] == "batch":
+    # python -m j1nx batch ...  -> relatórios em lote, sem interface: despacha
+    # antes de importar customtkinter/tkinter, ausentes numa máquina sem tela.
+    # Rodar batch como __main__ faz os processos "spawn" reimportarem batch, não este módulo
+    import runpy
+    del sys.argv[1]
+    runpy.run_module("batch", run_name="__main__", alter_sys=True)
+    sys.exit(0)
+
+from PIL import ImageTk
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import pandas as pd
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as RLImage, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
-from reportlab.lib.pagesizes import letter
-import io
+import os
+import threading
+import time
+
+from annotation_store import AnnotationStore, parse_tags
+from display import DEFAULT_SIZE, FrameRenderer
+from extraction import extract_thumbnails
+from filmstrip import Filmstrip
+from frame_index import load_or_build_index
+from frame_source import open_source
+from navigator import DecodeWorker, FrameNavigator
+import perf
+from proxy import ProxyBuilder
+from reports import VOLUME_SIZE, report_frames, write_csv, write_pdf
+from scene_cuts import load_or_analyze
+from thumb_store import ThumbnailStore
 
 # =============== CONFIGURAÇÃO VISUAL ===============
 ctk.set_appearance_mode("dark")
@@ -20,12 +40,31 @@ class VideoAnnotatorApp(ctk.CTk):
         self.title("🎞️ Anotador de Vídeo por Frames")
         self.geometry("1050x800")
 
-        self.cap = None
+        self.source = None  # FrameSource do vídeo (ou do proxy) em navegação
+        self.video_path = None
+        self.index = None
+        self.navigator = None
+        self.decoder = None
+        self.scenes = None  # cortes de cena (preenchido pela análise em segundo plano)
+        self._scene_job = None
+        self._scene_error = None  # exceção da última análise de cortes, se falhou
+        self.proxy = None  # ProxyBuilder do vídeo atual (modo proxy ligado)
+        self._proxy_job = None
+        self.using_proxy = False
+        self.playing = False
+        self._play_job = None
         self.total_frames = 0
         self.frame_number = 0
         self.annotations = {}
-        self.thumbnails = {}
+        self._store_error = None  # último erro de gravação já avisado ao usuário
+        self.range_start = None  # início marcado para a próxima anotação por trecho
+        self.thumbs = None  # miniaturas JPEG em disco (para o PDF)
         self.global_comment = ""
+        # buffers de exibição reaproveitados: um para a thread da interface, um anel para a de decodificação
+        self.renderer = FrameRenderer()
+        self.decode_renderer = FrameRenderer(buffers=3)
+        self._photo = None  # PhotoImage persistente; só é recriado quando o tamanho muda
+        self._resize_job = None
 
         # Layout principal
         self.video_label = ctk.CTkLabel(self, text="Nenhum vídeo carregado.")
@@ -36,6 +75,10 @@ class VideoAnnotatorApp(ctk.CTk):
         self.frame_info_label = ctk.CTkLabel(self, textvariable=self.frame_var, font=("Arial", 14))
         self.frame_info_label.pack(pady=2)
 
+        # FPS alcançado x alvo durante a reprodução
+        self.fps_var = tk.StringVar(value="")
+        ctk.CTkLabel(self, textvariable=self.fps_var, font=("Arial", 11)).pack()
+
         # === Controles ===
         control_frame = ctk.CTkFrame(self)
         control_frame.pack(pady=5)
@@ -49,9 +92,53 @@ class VideoAnnotatorApp(ctk.CTk):
         self.btn_next = ctk.CTkButton(control_frame, text="➡️ Próximo", command=self.next_frame)
         self.btn_next.grid(row=0, column=2, padx=10)
 
+        self.btn_play = ctk.CTkButton(control_frame, text="▶️ Reproduzir", command=self.toggle_play)
+        self.btn_play.grid(row=0, column=3, padx=10)
+
+        self.speed_var = tk.StringVar(value="1x")
+        self.speed_menu = ctk.CTkOptionMenu(control_frame, variable=self.speed_var, width=80,
+                                            values=["0.25x", "0.5x", "1x", "2x", "4x"],
+                                            command=self.speed_changed)
+        self.speed_menu.grid(row=0, column=4, padx=10)
+
+        # Proxy de navegação (todos os frames intra, baixa resolução)
+        self.proxy_switch = ctk.CTkSwitch(control_frame, text="⚡ Proxy", command=self.proxy_toggled)
+        self.proxy_switch.grid(row=1, column=0, padx=10, pady=5)
+
+        # Navegação por cortes de cena
+        self.btn_prev_cut = ctk.CTkButton(control_frame, text="⏮️ Corte anterior", command=self.prev_cut)
+        self.btn_prev_cut.grid(row=1, column=1, padx=10, pady=5)
+        self.btn_next_cut = ctk.CTkButton(control_frame, text="⏭️ Próximo corte", command=self.next_cut)
+        self.btn_next_cut.grid(row=1, column=2, padx=10, pady=5)
+        self.btn_mark_cuts = ctk.CTkButton(control_frame, text="✨ Pré-anotar cortes", command=self.annotate_cuts)
+        self.btn_mark_cuts.grid(row=1, column=3, padx=10, pady=5)
+        self.scene_var = tk.StringVar(value="")
+        ctk.CTkLabel(control_frame, textvariable=self.scene_var, font=("Arial", 11)).grid(row=1, column=4, padx=10)
+
+        # Setas do teclado (segurar ➡️ funciona como reprodução graças à pré-busca)
+        self.bind("<Right>", lambda e: self._on_arrow(e, self.next_frame))
+        self.bind("<Left>", lambda e: self._on_arrow(e, self.prev_frame))
+
+        # HUD de desempenho sobre o vídeo: F2 liga/desliga a medição, F3 salva em JSON
+        self.hud_var = tk.StringVar(value="")
+        self.hud = tk.Label(self, textvariable=self.hud_var, justify="left", anchor="nw",
+                            font=("Courier", 10), bg="#000000", fg="#7cfc00")
+        self._hud_job = None
+        self.bind("<F2>", lambda e: self.toggle_hud())
+        self.bind("<F3>", lambda e: self.dump_perf())
+
+        # === Filmstrip (miniaturas da linha do tempo) ===
+        self.filmstrip = Filmstrip(self, on_select=self.jump_to)
+        self.filmstrip.pack(pady=(10, 0), fill="x", padx=20)
+
         # === Slider ===
         self.slider = ctk.CTkSlider(self, from_=0, to=1, number_of_steps=1, command=self.slider_changed)
         self.slider.pack(pady=10, fill="x", padx=20)
+        self.slider.bind("<ButtonRelease-1>", self.slider_released)
+        # prévia ao passar o mouse vem do cache da filmstrip, não do decoder
+        self.slider.bind("<Motion>", lambda e: self.filmstrip.hover_fraction(
+            e.x / max(self.slider.winfo_width(), 1), e.x_root, e.y_root))
+        self.slider.bind("<Leave>", lambda e: self.filmstrip.hide_hover())
 
         # === Campo de anotação ===
         ctk.CTkLabel(self, text="📝 Observação para este frame:").pack(pady=5)
@@ -61,6 +148,25 @@ class VideoAnnotatorApp(ctk.CTk):
         self.btn_save_note = ctk.CTkButton(self, text="💾 Salvar anotação", command=self.save_annotation)
         self.btn_save_note.pack(pady=5)
 
+        # === Anotação por trecho (início marcado até o frame atual) ===
+        range_frame = ctk.CTkFrame(self)
+        range_frame.pack(pady=5)
+        self.btn_range_start = ctk.CTkButton(range_frame, text="⏺️ Marcar início", width=120,
+                                             command=self.mark_range_start)
+        self.btn_range_start.grid(row=0, column=0, padx=5)
+        self.range_note = ctk.CTkEntry(range_frame, width=280, placeholder_text="Observação do trecho")
+        self.range_note.grid(row=0, column=1, padx=5)
+        self.range_tags = ctk.CTkEntry(range_frame, width=160, placeholder_text="tags (separadas por vírgula)")
+        self.range_tags.grid(row=0, column=2, padx=5)
+        self.btn_save_range = ctk.CTkButton(range_frame, text="💾 Salvar trecho", width=120, command=self.save_range)
+        self.btn_save_range.grid(row=0, column=3, padx=5)
+        self.btn_remove_range = ctk.CTkButton(range_frame, text="🗑️ Remover trecho", width=120,
+                                              command=self.remove_range)
+        self.btn_remove_range.grid(row=0, column=4, padx=5)
+        self.range_var = tk.StringVar(value="")
+        ctk.CTkLabel(range_frame, textvariable=self.range_var, font=("Arial", 11)).grid(
+            row=1, column=0, columnspan=5, pady=(3, 0))
+
         # === Comentário global ===
         ctk.CTkLabel(self, text="💬 Comentário global:").pack(pady=5)
         self.global_text = ctk.CTkTextbox(self, height=120)
@@ -73,58 +179,146 @@ class VideoAnnotatorApp(ctk.CTk):
         self.btn_export_csv.grid(row=0, column=0, padx=15)
         self.btn_export_pdf = ctk.CTkButton(export_frame, text="🧾 Exportar PDF", command=self.export_pdf)
         self.btn_export_pdf.grid(row=0, column=1, padx=15)
+        # progresso dos relatórios grandes (só aparece durante a exportação)
+        self.export_progress = ctk.CTkProgressBar(export_frame)
+        self.export_progress.set(0)
+
+        # Resultados da thread de decodificação são recolhidos no laço do Tk
+        self.after(15, self._poll_decoder)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        # tamanho de exibição acompanha a janela
+        self.bind("<Configure>", self._on_resize)
 
     # =============== FUNÇÕES PRINCIPAIS ===============
     def load_video(self):
         path = filedialog.askopenfilename(filetypes=[("Vídeos", "*.mp4 *.avi *.mov")])
         if not path:
             return
-        self.cap = cv2.VideoCapture(path)
-        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.pause()
+        self._autosave()
+        self._stop_proxy()
+        if self.decoder:
+            self.decoder.close()
+        if self.navigator:
+            self.navigator.close()
+        self.video_path = path
+        # índice de keyframes/PTS (construído uma vez e reaproveitado nas próximas aberturas)
+        self.index = load_or_build_index(path)
+        # backend de decodificação escolhido pelo codec (ou J1NX_BACKEND)
+        self.source = open_source(path, self.index)
+        self.navigator = FrameNavigator(self.source, display_size=self.renderer.size)
+        self.using_proxy = False
+        if self.thumbs:
+            self.thumbs.close()
+        self.thumbs = ThumbnailStore(self.index.video_hash)
+        self.decoder = DecodeWorker(self.navigator, self.decode_renderer.render)
+        # anotações do vídeo (pelo hash): retomam de onde pararam e são salvas sozinhas
+        if isinstance(self.annotations, AnnotationStore):
+            self.annotations.close()
+        self.annotations = AnnotationStore(self.index.video_hash)
+        self.range_start = None
+        self.note_text.delete("1.0", "end")
+        self.global_text.delete("1.0", "end")
+        self.global_text.insert("1.0", self.annotations.global_comment)
+        self.frame_number = 0
+        self.total_frames = self.source.frame_count
         if self.total_frames <= 0:
             messagebox.showerror("Erro", "Não foi possível ler o vídeo.")
             return
         # ajustar slider
         self.slider.configure(to=self.total_frames - 1, number_of_steps=self.total_frames - 1)
+        self.filmstrip.load(path, self.index)
+        self.filmstrip.set_ranges(self._ranges())
+        self._start_scene_analysis()
+        if self.proxy_switch.get():
+            self._start_proxy()
         # mostrar primeiro frame
         self.show_frame(0)
 
     def show_frame(self, frame_number):
         """Exibe um frame e atualiza a interface"""
-        if not self.cap:
+        if not self.source:
             return
 
-        # Auto-save do frame anterior
+        with perf.stage("show_frame"):
+            # Ler frame (cache, leitura sequencial ou keyframe mais próximo + decodificação)
+            frame = self.navigator.get(frame_number)
+            if frame is None:
+                return
+            self._display_frame(frame_number, self.renderer.render(frame))
+
+    def _autosave(self):
+        """Guarda a nota do frame atual e o comentário global (o store grava em disco em segundo plano)"""
         try:
             prev_note = self.note_text.get("1.0", "end").strip()
             if prev_note:
                 self.annotations[self.frame_number] = prev_note
+            if isinstance(self.annotations, AnnotationStore):
+                self.annotations.global_comment = self.global_text.get("1.0", "end").strip()
         except Exception:
             # não bloquear caso textbox não exista ainda
             pass
-
-        # Ler frame
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-        ret, frame = self.cap.read()
-        if not ret:
+        self._check_store_error()
+
+    def _check_store_error(self):
+        """Avisa (uma vez por erro) que o banco não está aceitando as gravações; True se houver erro"""
+        error = getattr(self.annotations, "last_error", None)
+        if error is not None and error is not self._store_error:
+            messagebox.showwarning(
+                "Anotações não gravadas",
+                f"Não foi possível gravar as anotações no disco ({error}). "
+                "Elas continuam na memória e a gravação será tentada de novo.")
+        self._store_error = error
+        return error is not None
+
+    def _show_image(self, img):
+        """Cola a imagem no PhotoImage persistente (um novo só quando o tamanho de exibição muda)"""
+        if self._photo is None or (self._photo.width(), self._photo.height()) != img.size:
+            with perf.stage("PhotoImage.new"):
+                self._photo = ImageTk.PhotoImage(image=img)
+                self.video_label.configure(image=self._photo, text="")
+        else:
+            with perf.stage("PhotoImage.paste"):
+                self._photo.paste(img)
+
+    def _on_resize(self, event):
+        if event.widget is not self:
             return
+        # altura livre = janela menos o que os demais widgets pedem; o vídeo
+        # nunca fica menor que DEFAULT_SIZE (os controles ocupam ~720 px)
+        others = self.winfo_reqheight() - self.video_label.winfo_reqheight()
+        width = max(event.width - 40, DEFAULT_SIZE[0])
+        height = max(event.height - others - 20, DEFAULT_SIZE[1])
+        for renderer in (self.renderer, self.decode_renderer):
+            renderer.set_size(width, height)
+        if self.navigator:
+            self.navigator.set_display_size(*self.renderer.size)
+        if self._resize_job:
+            self.after_cancel(self._resize_job)
+        self._resize_job = self.after(150, self._redisplay)
+
+    def _redisplay(self):
+        self._resize_job = None
+        if self.source and not self.playing:
+            self.show_frame(self.frame_number)
+
+    def _display_frame(self, frame_number, img):
+        # Auto-save do frame anterior
+        self._autosave()
 
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = Image.fromarray(frame_rgb)
-        img.thumbnail((640, 360))
-        imgtk = ImageTk.PhotoImage(image=img)
-        self.video_label.configure(image=imgtk, text="")
-        self.video_label.image = imgtk
+        self._show_image(img)
 
-        # Atualiza miniatura cache (para PDF)
-        thumb = img.copy()
-        thumb.thumbnail((250, 250))
-        self.thumbnails[frame_number] = thumb
+        # Atualiza miniatura cache (para PDF): codificada uma vez e guardada em disco;
+        # com o proxy ativo fica para a exportação, que lê o original
+        if not self.using_proxy and frame_number not in self.thumbs:
+            with perf.stage("thumbs.put"):
+                self.thumbs.put(frame_number, img)
 
         # Atualiza anotação visível
         self.note_text.delete("1.0", "end")
         if frame_number in self.annotations:
             self.note_text.insert("1.0", self.annotations[frame_number])
+        self._update_range_label(frame_number)
 
         # Atualiza label de frame atual via StringVar (garante atualização imediata)
         # +1 apenas para exibir em base 1 ao usuário (frame humano começa em 1)
@@ -137,87 +331,439 @@ class VideoAnnotatorApp(ctk.CTk):
         # guarda número atual
         self.frame_number = frame_number
 
-    def slider_changed(self, value):
-        """O CTkSlider passa valores float; convertemos para int e mostramos o frame"""
+    def _display_image(self, img, caption):
+        # só a imagem e o rótulo (prévia/reprodução): a anotação só troca ao parar num frame
+        self._show_image(img)
+        self.frame_var.set(caption)
+
+    def _poll_decoder(self):
+        if self.decoder:
+            result = self.decoder.take_result()
+            if result:
+                frame_number, preview, img = result
+                # a thread de decodificação não reaproveita este buffer enquanto ele é colado
+                with self.decode_renderer.reading(img):
+                    if self.playing:
+                        pass  # a reprodução controla a imagem
+                    elif preview:
+                        self._display_image(img, f"Prévia do frame {frame_number + 1} de {self.total_frames}")
+                    else:
+                        self._display_frame(frame_number, img)
+        self.after(15, self._poll_decoder)
+
+    def _slider_value(self, value):
         try:
-            v = int(float(value))
+            return int(float(value))
         except Exception:
-            v = int(value)
-        # evita re-chamar se já estivermos nesse frame
-        if v != self.frame_number:
-            self.show_frame(v)
+            return int(value)
+
+    def slider_changed(self, value):
+        """O CTkSlider passa valores float; durante o arraste pedimos só uma prévia à thread de decodificação"""
+        self.pause()
+        v = self._slider_value(value)
+        if self.decoder:
+            self.decoder.request(v, preview=True)
+
+    def slider_released(self, event=None):
+        """Ao soltar o slider, o frame exato é decodificado em resolução total"""
+        v = self._slider_value(self.slider.get())
+        if self.decoder:
+            self.decoder.request(v, preview=False)
+
+    def jump_to(self, frame_number):
+        self.pause()
+        if self.source:
+            self.slider.set(frame_number)
+            self.show_frame(frame_number)
 
     def next_frame(self):
-        if self.cap:
+        self.pause()
+        if self.source:
             new_frame = min(self.frame_number + 1, self.total_frames - 1)
             # ajustar slider e mostrar (set pode disparar o comando; chamamos show_frame para garantir)
             self.slider.set(new_frame)
             self.show_frame(new_frame)
 
     def prev_frame(self):
-        if self.cap:
+        self.pause()
+        if self.source:
             new_frame = max(self.frame_number - 1, 0)
             self.slider.set(new_frame)
             self.show_frame(new_frame)
 
+    # =============== CORTES DE CENA ===============
+    def _start_scene_analysis(self):
+        """Detecta cortes numa thread (ou lê do cache lateral) sem travar a interface"""
+        if self._scene_job:
+            self.after_cancel(self._scene_job)
+        self.scenes = None
+        self._scene_error = None
+        state = {"progress": 0.0, "result": None, "error": None, "done": False}
+        path, video_hash, total = self.video_path, self.index.video_hash, self.total_frames
+
+        def run():
+            def progress(done, total_frames):
+                state["progress"] = done / max(total_frames, 1)
+            try:
+                # para a análise antiga se outro vídeo for aberto no meio
+                state["result"] = load_or_analyze(path, video_hash, total, progress=progress,
+                                                  stop=lambda: self.video_path != path)
+            except Exception as exc:  # erro de decodificação, pasta do cache ilegível...
+                state["error"] = exc
+            finally:
+                state["done"] = True
+
+        threading.Thread(target=run, daemon=True).start()
+        self._poll_scenes(state, path)
+
+    def _poll_scenes(self, state, path):
+        self._scene_job = None
+        if self.video_path != path:
+            return
+        if not state["done"]:
+            self.scene_var.set(f"Analisando cortes... {state['progress']:.0%}")
+            self._scene_job = self.after(250, self._poll_scenes, state, path)
+            return
+        if state["error"] is not None:
+            self._scene_error = state["error"]
+            self.scene_var.set(f"Falha na análise de cortes: {state['error']}")
+            return
+        self.scenes = state["result"]
+        self.scene_var.set(f"{len(self.scenes.cuts)} corte(s)" if self.scenes is not None else "")
+
+    def _scenes_ready(self):
+        if self._scene_error is not None:
+            messagebox.showerror("Cortes indisponíveis", f"A análise de cortes falhou: {self._scene_error}")
+            return False
+        if self.scenes is None:
+            messagebox.showinfo("Aguarde", "A análise de cortes ainda está em andamento.")
+            return False
+        return True
+
+    def next_cut(self):
+        if self.source and self._scenes_ready():
+            f = self.scenes.next_cut(self.frame_number)
+            if f is not None:
+                self.jump_to(f)
+
+    def prev_cut(self):
+        if self.source and self._scenes_ready():
+            f = self.scenes.prev_cut(self.frame_number)
+            if f is not None:
+                self.jump_to(f)
+
+    def annotate_cuts(self):
+        """Cria uma anotação inicial em cada corte ainda sem observação"""
+        if not (self.source and self._scenes_ready()):
+            return
+        added = 0
+        for f in self.scenes.cuts:
+            f = int(f)
+            if f not in self.annotations:
+                self.annotations[f] = f"Corte de cena (mudança {self.scenes.scores[f]:.2f})"
+                added += 1
+        if self.frame_number in self.annotations and not self.note_text.get("1.0", "end").strip():
+            self.note_text.insert("1.0", self.annotations[self.frame_number])
+        messagebox.showinfo("Cortes", f"{added} frame(s) de corte pré-anotado(s).")
+
+    # =============== PROXY DE NAVEGAÇÃO ===============
+    def proxy_toggled(self):
+        if not self.source:
+            return
+        if self.proxy_switch.get():
+            self._start_proxy()
+        else:
+            self._stop_proxy()
+            self._set_navigation_source(self.video_path, self.index)
+
+    def _start_proxy(self):
+        # gerado uma vez por vídeo; depois disso volta pronto do cache
+        self.proxy = ProxyBuilder(self.video_path, self.index)
+        self._poll_proxy()
+
+    def _poll_proxy(self):
+        self._proxy_job = None
+        if self.proxy is None:
+            return
+        if self.proxy.running:
+            self.proxy_switch.configure(text=f"⚡ Proxy {self.proxy.fraction:.0%}")
+            self._proxy_job = self.after(500, self._poll_proxy)
+            return
+        if self.proxy.result is None:
+            self.proxy_switch.configure(text="⚡ Proxy")
+            self.proxy_switch.deselect()
+            messagebox.showwarning("Proxy", f"Não foi possível gerar o proxy: {self.proxy.error}")
+            self.proxy = None
+            return
+        self.proxy_switch.configure(text="⚡ Proxy ativo")
+        self._set_navigation_source(*self.proxy.result)
+
+    def _stop_proxy(self):
+        if self._proxy_job:
+            self.after_cancel(self._proxy_job)
+            self._proxy_job = None
+        if self.proxy:
+            self.proxy.stop()
+            self.proxy = None
+        self.proxy_switch.configure(text="⚡ Proxy")
+
+    def _set_navigation_source(self, path, index):
+        """Troca o arquivo usado para navegar (proxy ou original); os números de frame não mudam"""
+        proxied = path != self.video_path
+        if proxied == self.using_proxy:
+            return
+        self.pause()
+        self.decoder.close()
+        self.navigator.close()
+        self.source = open_source(path, index)
+        self.navigator = FrameNavigator(self.source, display_size=self.renderer.size)
+        self.decoder = DecodeWorker(self.navigator, self.decode_renderer.render)
+        self.using_proxy = proxied
+        self.show_frame(self.frame_number)
+
+    # =============== REPRODUÇÃO ===============
+    def toggle_play(self):
+        if self.playing:
+            self.pause()
+        else:
+            self.play()
+
+    def play(self):
+        """Reproduz no FPS do vídeo (vezes a velocidade), descartando frames se a exibição atrasar"""
+        if not self.source or self.playing:
+            return
+        if self.frame_number >= self.total_frames - 1:
+            self.show_frame(0)
+        self.playing = True
+        self.btn_play.configure(text="⏸️ Pausar")
+        self._play_shown = self.frame_number
+        self._play_window = (time.monotonic(), 0, 0)  # início da janela, exibidos, descartados
+        self._anchor_clock()
+        self._play_tick()
+
+    def _anchor_clock(self):
+        # relógio monotônico <-> tempo de mídia, a partir do frame exibido
+        self._play_speed = float(self.speed_var.get().rstrip("x"))
+        self._play_origin = (time.monotonic(), self.index.timestamp(self._play_shown))
+
+    def speed_changed(self, value):
+        if self.playing:
+            self._anchor_clock()
+
+    def _play_tick(self):
+        self._play_job = None
+        if not self.playing:
+            return
+        wall0, media0 = self._play_origin
+        target = self.index.frame_at(media0 + (time.monotonic() - wall0) * self._play_speed)
+
+        if target != self._play_shown:
+            frame = self.navigator.get(target)
+            if frame is None:
+                self.pause()
+                return
+            started, shown, dropped = self._play_window
+            # frames pulados entre o último exibido e o alvo foram descartados
+            self._play_window = (started, shown + 1, dropped + max(target - self._play_shown - 1, 0))
+            self._play_shown = target
+            self._display_image(self.renderer.render(frame), f"Reproduzindo frame {target + 1} de {self.total_frames}")
+            self.slider.set(target)
+            self._update_fps_label()
+
+        if target >= self.total_frames - 1:
+            self.pause()
+            return
+        # agenda o próximo tique para o instante em que o frame seguinte vence
+        due = wall0 + (self.index.timestamp(target + 1) - media0) / self._play_speed
+        delay = max(int((due - time.monotonic()) * 1000), 1)
+        self._play_job = self.after(delay, self._play_tick)
+
+    def _update_fps_label(self):
+        started, shown, dropped = self._play_window
+        elapsed = time.monotonic() - started
+        if elapsed < 1.0:
+            return
+        target_fps = self.source.fps * self._play_speed
+        self.fps_var.set(f"Reprodução: {shown / elapsed:.1f} / {target_fps:.1f} fps (descartados: {dropped})")
+        self._play_window = (time.monotonic(), 0, 0)
+
+    def pause(self):
+        """Para a reprodução exatamente no último frame exibido"""
+        if not self.playing:
+            return
+        self.playing = False
+        if self._play_job:
+            self.after_cancel(self._play_job)
+            self._play_job = None
+        self.btn_play.configure(text="▶️ Reproduzir")
+        self.fps_var.set("")
+        # frame_number ainda é o do início: o auto-save grava a nota no frame certo
+        self.slider.set(self._play_shown)
+        self.show_frame(self._play_shown)
+
+    def _on_arrow(self, event, action):
+        # nas caixas de texto as setas continuam movendo o cursor
+        if isinstance(event.widget, (tk.Text, tk.Entry)):
+            return
+        action()
+
     def save_annotation(self):
         note = self.note_text.get("1.0", "end").strip()
         self.annotations[self.frame_number] = note
-        messagebox.showinfo("Salvo", f"Anotação salva para o frame {self.frame_number}.")
+        if not self._check_store_error():
+            messagebox.showinfo("Salvo", f"Anotação salva para o frame {self.frame_number}.")
+
+    # =============== ANOTAÇÕES POR TRECHO ===============
+    def _ranges(self):
+        """[(início, fim, nota, tags)] do vídeo atual, como os relatórios esperam"""
+        if not isinstance(self.annotations, AnnotationStore):
+            return []
+        return [r[1:] for r in self.annotations.ranges()]
+
+    def _update_range_label(self, frame_number):
+        if not isinstance(self.annotations, AnnotationStore):
+            return
+        # consulta no índice de intervalos: não percorre todos os trechos a cada frame
+        parts = []
+        for _, start, end, note, tags in self.annotations.ranges_at(frame_number):
+            label = f"{start}–{end}: {note}"
+            parts.append(f"{label} [{', '.join(tags)}]" if tags else label)
+        text = "Trechos neste frame: " + "; ".join(parts) if parts else ""
+        if self.range_start is not None:
+            text = f"Início marcado no frame {self.range_start}.  {text}"
+        self.range_var.set(text)
+
+    def mark_range_start(self):
+        if not self.source:
+            return
+        self.range_start = self.frame_number
+        self._update_range_label(self.frame_number)
+
+    def save_range(self):
+        """Anota o trecho do início marcado até o frame atual (ou só o frame atual)"""
+        if not isinstance(self.annotations, AnnotationStore):
+            return
+        note = self.range_note.get().strip()
+        if not note:
+            messagebox.showwarning("Aviso", "Escreva a observação do trecho.")
+            return
+        start = self.frame_number if self.range_start is None else self.range_start
+        self.annotations.add_range(start, self.frame_number, note, parse_tags(self.range_tags.get()))
+        self.range_start = None
+        self.range_note.delete(0, "end")
+        self.filmstrip.set_ranges(self._ranges())
+        self._update_range_label(self.frame_number)
+
+    def remove_range(self):
+        """Remove o trecho mais recente que cobre o frame atual"""
+        if not isinstance(self.annotations, AnnotationStore):
+            return
+        covering = self.annotations.ranges_at(self.frame_number)
+        if not covering:
+            messagebox.showinfo("Trechos", "Nenhum trecho cobre este frame.")
+            return
+        range_id, start, end, note, _ = max(covering)
+        if messagebox.askyesno("Remover trecho", f"Remover o trecho {start}–{end}?\n\n{note}"):
+            self.annotations.remove_range(range_id)
+            self.filmstrip.set_ranges(self._ranges())
+            self._update_range_label(self.frame_number)
 
     # =============== EXPORTAR RELATÓRIOS ===============
     def export_csv(self):
-        if not self.annotations:
+        ranges = self._ranges()
+        if not self.annotations and not ranges:
             messagebox.showwarning("Aviso", "Nenhuma anotação para exportar.")
             return
         path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")])
         if not path:
             return
-        rows = [{"Frame": f, "Observação": n} for f, n in sorted(self.annotations.items())]
-        rows.append({"Frame": "Comentário Global", "Observação": self.global_text.get("1.0", "end").strip()})
-        df = pd.DataFrame(rows)
         try:
-            df.to_csv(path, index=False, encoding="utf-8-sig")
+            write_csv(path, self.annotations, self.global_text.get("1.0", "end").strip(), ranges)
             messagebox.showinfo("Exportado", "Relatório CSV criado com sucesso!")
         except Exception as e:
             messagebox.showerror("Erro", f"Falha ao exportar CSV: {e}")
 
     def export_pdf(self):
-        if not self.annotations:
+        ranges = self._ranges()
+        if not self.annotations and not ranges:
             messagebox.showwarning("Aviso", "Nenhuma anotação para exportar.")
             return
         path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF", "*.pdf")])
         if not path:
             return
 
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle("title", parent=styles["Heading1"], alignment=TA_CENTER, fontSize=16)
-        frame_style = ParagraphStyle("frame", parent=styles["Normal"], alignment=TA_JUSTIFY, fontSize=12, spaceAfter=10)
-        comment_style = ParagraphStyle("comment", parent=styles["Normal"], alignment=TA_CENTER, fontSize=12)
-
-        doc = SimpleDocTemplate(path, pagesize=letter, rightMargin=40, leftMargin=40, topMargin=40, bottomMargin=40)
-        elements = [Paragraph("Relatório de Anotações por Frame", title_style), Spacer(1, 12)]
+        # Miniaturas: bytes JPEG do cache; frames nunca visitados são extraídos agora
+        # (cada trecho usa a miniatura do seu frame central)
+        missing = self.thumbs.missing(report_frames(self.annotations, ranges))
+        with perf.stage("pdf.thumbnails"):
+            for f, data in extract_thumbnails(self.video_path, self.index, missing, size=self.thumbs.size):
+                self.thumbs.put_bytes(f, data)
 
-        # Miniaturas e observações (reutiliza thumbnails cacheadas)
-        for f, n in sorted(self.annotations.items()):
-            img = self.thumbnails.get(f)
-            if img:
-                buf = io.BytesIO()
-                img.save(buf, format="JPEG")
-                buf.seek(0)
-                elements.append(RLImage(buf, width=img.width, height=img.height))
-            elements.append(Paragraph(f"<b>Frame {f}</b>: {n}", frame_style))
+        # O PDF é gerado em fluxo, lendo uma miniatura por vez do cache em disco;
+        # relatórios com mais de VOLUME_SIZE anotações saem em volumes numerados
+        self.export_progress.set(0)
+        self.export_progress.grid(row=1, column=0, columnspan=2, pady=(10, 0), sticky="ew")
 
-        # Comentário global
-        elements.append(PageBreak())
-        elements.append(Paragraph("Comentário Global", title_style))
-        elements.append(Paragraph(self.global_text.get("1.0", "end"), comment_style))
+        def progress(done, total):
+            self.export_progress.set(done / total)
+            self.update_idletasks()
 
         try:
-            doc.build(elements)
-            messagebox.showinfo("Exportado", "Relatório PDF criado com sucesso!")
+            paths = write_pdf(path, self.annotations, self.global_text.get("1.0", "end"), self.thumbs,
+                              progress=progress, volume_size=VOLUME_SIZE, ranges=ranges)
+            if len(paths) == 1:
+                messagebox.showinfo("Exportado", "Relatório PDF criado com sucesso!")
+            else:
+                names = "\n".join(os.path.basename(p) for p in paths)
+                messagebox.showinfo("Exportado", f"Relatório PDF criado em {len(paths)} volumes:\n{names}")
         except Exception as e:
             messagebox.showerror("Erro", f"Falha ao gerar PDF: {e}")
+        finally:
+            self.export_progress.grid_remove()
+
+    # =============== DESEMPENHO ===============
+    def toggle_hud(self):
+        if self._hud_job:
+            self.after_cancel(self._hud_job)
+            self._hud_job = None
+            self.hud.place_forget()
+            perf.enable(False)
+            return
+        perf.reset()
+        perf.enable(True)
+        self.hud.place(in_=self.video_label, x=6, y=6)
+        self._update_hud()
+
+    def _perf_caches(self):
+        if not self.navigator:
+            return {}
+        return self.navigator.caches
+
+    def _update_hud(self):
+        self.hud_var.set(perf.format_summary(perf.summary(self._perf_caches())))
+        self.hud.lift()
+        self._hud_job = self.after(500, self._update_hud)
+
+    def dump_perf(self):
+        """Salva as medições atuais (etapas e caches) em JSON"""
+        if not perf.is_enabled():
+            messagebox.showinfo("Desempenho", "Ligue a medição com F2 antes de salvar.")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if path:
+            perf.dump(path, self._perf_caches())
+
+    def on_close(self):
+        """Grava as anotações pendentes antes de fechar a janela"""
+        self.pause()
+        self._autosave()
+        self._stop_proxy()
+        if isinstance(self.annotations, AnnotationStore):
+            self.annotations.close()
+            if self.annotations.last_error is not None:
+                messagebox.showerror("Anotações não gravadas",
+                                     f"As últimas alterações não foram gravadas: {self.annotations.last_error}")
+        self.destroy()
 
 if __name__ == "__main__":
     app = VideoAnnotatorApp()
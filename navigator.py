@@ -0,0 +1,359 @@
+"""Navegação entre frames: acesso sequencial rápido, cache LRU e pré-busca.
+
+O `FrameNavigator` é o dono da `FrameSource` (qualquer backend): ela sabe qual
+frame o decoder devolve a seguir, então um passo para frente é só um `read()`. Frames
+decodificados ficam num LRU limitado em MB e uma thread de fundo decodifica
+os próximos N frames enquanto o usuário avança; ao retroceder, GOPs inteiros
+são decodificados uma vez e servidos de um cache de blocos com duas vagas (o
+GOP atual e o anterior, pré-decodificado), dimensionado pelo GOP do vídeo.
+"""
+import math
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+import perf
+from display import DEFAULT_SIZE
+
+DEFAULT_CACHE_MB = 256
+DEFAULT_PREFETCH = 8
+DEFAULT_CHUNK_MB = 384
+DEFAULT_CHUNK_SIZE = (1280, 720)  # frames do cache de blocos (retrocesso) cabem neste tamanho
+
+
+class FrameLRU:
+    """Cache LRU de frames decodificados limitado pelo total de bytes"""
+
+    def __init__(self, max_mb=DEFAULT_CACHE_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, frame_number):
+        with self._lock:
+            return frame_number in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, frame_number):
+        with self._lock:
+            frame = self._items.get(frame_number)
+            if frame is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(frame_number)
+            self.hits += 1
+            return frame
+
+    def put(self, frame_number, frame):
+        size = frame.nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(frame_number, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._items[frame_number] = frame
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+
+class FrameNavigator:
+    """Entrega frames BGR por número, reaproveitando a posição do decoder.
+
+    Ao andar para trás, o GOP inteiro até o frame pedido é decodificado uma
+    única vez e guardado (reduzido a `chunk_size`) no cache de blocos; os
+    passos seguintes para trás saem desse cache e o GOP anterior é
+    pré-decodificado em segundo plano numa vaga própria (`prev_chunks`), que
+    vira a vaga ativa quando o usuário chega nele. `chunk_mb` é dividido entre
+    as duas vagas e `chunk_size` encolhe até o maior GOP do índice caber em
+    cada uma, mas nunca abaixo de `display_size`: se nem assim o GOP couber,
+    só o fim dele (os frames mais perto do pedido) fica na vaga. Sem keyframes
+    no índice, um passo para trás decodifica só o frame pedido.
+    """
+
+    def __init__(self, source, cache_mb=DEFAULT_CACHE_MB, prefetch=DEFAULT_PREFETCH,
+                 chunk_mb=DEFAULT_CHUNK_MB, chunk_size=DEFAULT_CHUNK_SIZE, display_size=DEFAULT_SIZE):
+        self.source = source
+        self.index = source.index
+        self.cache = FrameLRU(cache_mb)
+        self.chunks = FrameLRU(chunk_mb / 2)       # GOP ativo
+        self.prev_chunks = FrameLRU(chunk_mb / 2)  # GOP anterior (pré-busca)
+        self._chunk_request = chunk_size
+        self._slot_bytes = int(chunk_mb / 2 * 1024 * 1024)
+        self.display_size = None
+        self.set_display_size(*display_size)  # define chunk_size e gop_capacity
+        self._chunk_gop = None  # keyframe inicial do GOP em cada vaga
+        self._prev_gop = None
+        self.prefetch = prefetch
+        self._last_request = None
+        self._decode_lock = threading.Lock()
+        self._wake = threading.Condition()
+        self._prefetch_job = None
+        self._generation = 0
+        self._closed = False
+        self._worker = None
+        if prefetch > 0:
+            self._worker = threading.Thread(target=self._prefetch_loop, daemon=True)
+            self._worker.start()
+
+    @property
+    def frame_count(self):
+        return self.index.frame_count
+
+    @property
+    def caches(self):
+        """Caches do navegador por nome (para `perf.summary`)"""
+        return {"frames": self.cache, "gop": self.chunks, "gop_prev": self.prev_chunks}
+
+    def _has_gops(self):
+        return bool(len(self.index.keyframes))
+
+    def set_display_size(self, width, height):
+        """Tamanho em que os frames são exibidos: piso do tamanho do cache de blocos"""
+        if self.display_size == (width, height):
+            return
+        self.display_size = (width, height)
+        self.chunk_size = self._fit_chunk_size()
+        w, h = self.chunk_size
+        # frames por vaga (estimativa por baixo: o frame reduzido cabe em chunk_size)
+        self.gop_capacity = max(self._slot_bytes // (w * h * 3), 1)
+
+    def _fit_chunk_size(self):
+        # o maior GOP do vídeo precisa caber inteiro numa vaga, sem ficar menor
+        # que a exibição (senão o passo para trás sairia mais borrado)
+        w, h = self._chunk_request
+        if self._has_gops():
+            bounds = np.append(self.index.keyframes, self.index.frame_count)
+            longest = max(int(np.diff(bounds).max()), 1)
+            scale = math.sqrt(self._slot_bytes / longest / (w * h * 3))
+            if scale < 1:
+                w, h = int(w * scale), int(h * scale)
+        return max(w, self.display_size[0]), max(h, self.display_size[1])
+
+    def _shrink(self, frame):
+        h, w = frame.shape[:2]
+        scale = min(self.chunk_size[0] / w, self.chunk_size[1] / h)
+        if scale >= 1:
+            return frame
+        return cv2.resize(frame, (max(int(w * scale), 1), max(int(h * scale), 1)), interpolation=cv2.INTER_AREA)
+
+    def _decode(self, frame_number, store=None):
+        # chamado sempre com _decode_lock: a FrameSource não é thread-safe.
+        # store: vaga do cache de blocos (frame reduzido) ou None para o LRU
+        frame = self.source.get(frame_number)
+        if frame is None:
+            return None
+        if store is not None:
+            frame = self._shrink(frame)
+            store.put(frame_number, frame)
+        else:
+            self.cache.put(frame_number, frame)
+        return frame
+
+    def _cached(self, frame_number):
+        frame = self.cache.get(frame_number)
+        if frame is None:
+            frame = self.chunks.get(frame_number)
+        if frame is None:
+            frame = self.prev_chunks.get(frame_number)
+        return frame
+
+    def _activate_gop(self, gop_start):
+        """Torna gop_start o GOP ativo; se for o pré-decodificado, só troca as vagas"""
+        if gop_start == self._chunk_gop:
+            return
+        self._cancel_prefetch()
+        with self._decode_lock:
+            if gop_start == self._prev_gop:
+                self.chunks, self.prev_chunks = self.prev_chunks, self.chunks
+                self._chunk_gop, self._prev_gop = self._prev_gop, self._chunk_gop
+            else:
+                self.chunks.clear()
+                self._chunk_gop = gop_start
+
+    def _prefetch_prev_gop(self, gop_start):
+        # o GOP anterior vai para a vaga própria, sem tocar no GOP ativo
+        if gop_start <= 0:
+            return
+        prev_start, prev_end = self.index.gop_bounds(gop_start - 1)
+        if prev_start != self._prev_gop:
+            self._cancel_prefetch()
+            with self._decode_lock:
+                self.prev_chunks.clear()
+                self._prev_gop = prev_start
+        # GOP maior que a vaga: só o fim, por onde o usuário vai chegar
+        self._schedule_prefetch(max(prev_start, prev_end - self.gop_capacity), prev_end,
+                                store=self.prev_chunks)
+
+    def get(self, frame_number):
+        """Frame BGR (ou None); dispara a pré-busca na direção da navegação"""
+        backward = self._last_request is not None and frame_number < self._last_request
+        self._last_request = frame_number
+        # sem keyframes não há GOP a decodificar: o passo para trás é um frame só
+        by_gop = backward and self._has_gops()
+        if by_gop:
+            gop_start = self.index.keyframe_before(frame_number)
+            self._activate_gop(gop_start)
+        frame = self._cached(frame_number)
+        if frame is None:
+            # inclui a espera pela pré-busca em andamento (o decoder é um só)
+            with perf.stage("decode"):
+                if by_gop:
+                    frame = self._decode_gop_until(frame_number)
+                else:
+                    with self._decode_lock:
+                        frame = self._decode(frame_number)
+
+        if by_gop:
+            self._prefetch_prev_gop(gop_start)
+        elif not backward:
+            self._schedule_prefetch(frame_number + 1, frame_number + 1 + self.prefetch)
+        return frame
+
+    def _decode_gop_until(self, frame_number):
+        """Decodifica do keyframe até frame_number uma vez só, guardando na vaga
+        ativa os frames que cabem nela (os mais próximos de frame_number)"""
+        self._cancel_prefetch()
+        # a FrameSource avança do keyframe até `start` sem converter pixels
+        start = max(self.index.keyframe_before(frame_number), frame_number - self.gop_capacity + 1)
+        frame = None
+        with self._decode_lock:
+            for n in range(start, frame_number + 1):
+                frame = self.chunks.get(n)
+                if frame is None:
+                    frame = self._decode(n, store=self.chunks)
+                    if frame is None:
+                        return None
+        return frame
+
+    def get_preview(self, frame_number):
+        """Frame aproximado e barato para prévias: o próprio frame se estiver em
+        cache, senão o keyframe anterior (uma única decodificação, sem avançar no GOP)"""
+        frame = self._cached(frame_number)
+        if frame is not None:
+            return frame
+        self._cancel_prefetch()
+        keyframe = self.index.keyframe_before(frame_number) if self._has_gops() else frame_number
+        frame = self._cached(keyframe)
+        if frame is None:
+            with self._decode_lock:
+                frame = self._decode(keyframe)
+        return frame
+
+    # --- Pré-busca em segundo plano ---
+    def _cancel_prefetch(self):
+        with self._wake:
+            self._generation += 1
+            self._prefetch_job = None
+
+    def _schedule_prefetch(self, start, end, store=None):
+        if self._worker is None:
+            return
+        with self._wake:
+            self._generation += 1
+            self._prefetch_job = (start, min(end, self.frame_count), store)
+            self._wake.notify()
+
+    def _prefetch_loop(self):
+        while True:
+            with self._wake:
+                while self._prefetch_job is None and not self._closed:
+                    self._wake.wait()
+                if self._closed:
+                    return
+                (start, end, store), generation = self._prefetch_job, self._generation
+                self._prefetch_job = None
+
+            for n in range(start, end):
+                if generation != self._generation or self._closed:
+                    break  # usuário pediu outro frame: abandona esta janela
+                if n in (self.cache if store is None else store):
+                    continue
+                # trava por frame para que um pedido da interface passe na frente
+                with self._decode_lock:
+                    # as vagas podem ter sido trocadas enquanto esperava a trava
+                    if generation != self._generation:
+                        break
+                    if self._decode(n, store=store) is None:
+                        break
+
+    def close(self):
+        with self._wake:
+            self._closed = True
+            self._wake.notify()
+        if self._worker is not None:
+            self._worker.join(timeout=1)
+        with self._decode_lock:
+            self.source.close()
+        self.cache.clear()
+        self.chunks.clear()
+        self.prev_chunks.clear()
+
+
+class DecodeWorker:
+    """Decodifica fora da thread da interface com uma caixa de correio de um
+    único pedido: pedidos intermediários são descartados e só o mais recente é
+    atendido. `render(frame, preview)` roda nesta thread; o resultado é
+    recolhido pela interface com `take_result()` (por exemplo num laço `after()`).
+    """
+
+    def __init__(self, navigator, render):
+        self.navigator = navigator
+        self.render = render
+        self._cond = threading.Condition()
+        self._request = None
+        self._result = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def request(self, frame_number, preview=False):
+        with self._cond:
+            self._request = (frame_number, preview)
+            self._cond.notify()
+
+    def take_result(self):
+        """(frame_number, preview, imagem) mais recente ou None"""
+        with self._cond:
+            result, self._result = self._result, None
+            return result
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._request is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                (frame_number, preview), self._request = self._request, None
+
+            if preview:
+                frame = self.navigator.get_preview(frame_number)
+            else:
+                frame = self.navigator.get(frame_number)
+            image = self.render(frame, preview) if frame is not None else None
+
+            with self._cond:
+                # se já chegou um pedido mais novo, este resultado está velho
+                if self._request is None and image is not None:
+                    self._result = (frame_number, preview, image)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=1)
@@ -0,0 +1,122 @@
+"""Medição leve do tempo de cada etapa (decodificação, conversão, exibição, relatórios).
+
+Os trechos instrumentados usam `with perf.stage("nome"):`. Desligada (o
+padrão), `stage()` devolve sempre o mesmo objeto nulo e o custo é só a
+checagem de uma flag. Ligada, cada etapa guarda as últimas `MAX_SAMPLES`
+durações, resumidas em p50/p95/p99 junto com as taxas de acerto dos caches.
+"""
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+MAX_SAMPLES = 2048
+
+_enabled = False
+_samples = {}
+_lock = threading.Lock()
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = bool(on)
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+
+
+def record(name, seconds):
+    with _lock:
+        samples = _samples.get(name)
+        if samples is None:
+            samples = _samples[name] = deque(maxlen=MAX_SAMPLES)
+        samples.append(seconds)
+
+
+class _Stage:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name):
+    """Context manager que mede a etapa `name` (nulo quando a medição está desligada)"""
+    return _Stage(name) if _enabled else _NULL_STAGE
+
+
+def summary(caches=None):
+    """Resumo das etapas e dos caches.
+
+    caches: {nome: objeto com `hits` e `misses`} (ex.: os FrameLRU do navegador).
+    """
+    with _lock:
+        snapshot = {name: np.fromiter(samples, dtype=np.float64) for name, samples in _samples.items()}
+    stages = {}
+    for name, values in sorted(snapshot.items()):
+        p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000.0
+        stages[name] = {
+            "count": int(values.size),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": float(values.max() * 1000.0),
+        }
+    cache_stats = {}
+    for name, cache in (caches or {}).items():
+        total = cache.hits + cache.misses
+        cache_stats[name] = {
+            "hits": cache.hits,
+            "misses": cache.misses,
+            "hit_ratio": cache.hits / total if total else None,
+        }
+    return {"stages": stages, "caches": cache_stats}
+
+
+def format_summary(data):
+    """Texto em colunas para o HUD"""
+    lines = [f"{'etapa':<18}{'n':>6}{'p50':>8}{'p95':>8}{'p99':>8}  ms"]
+    for name, s in data["stages"].items():
+        lines.append(f"{name:<18}{s['count']:>6}{s['p50_ms']:>8.2f}{s['p95_ms']:>8.2f}{s['p99_ms']:>8.2f}")
+    for name, c in data["caches"].items():
+        ratio = "--" if c["hit_ratio"] is None else f"{c['hit_ratio']:.0%}"
+        lines.append(f"cache {name:<12} {ratio:>5} ({c['hits']}/{c['hits'] + c['misses']})")
+    return "\n".join(lines)
+
+
+def to_json(caches=None):
+    return json.dumps(summary(caches), indent=2, ensure_ascii=False)
+
+
+def dump(path, caches=None):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(to_json(caches))
@@ -0,0 +1,154 @@
+"""Proxy de navegação: cópia pequena do vídeo com todos os frames intra.
+
+Em fontes H.264/HEVC de GOP longo cada busca aleatória decodifica até um GOP
+inteiro. O proxy é transcodificado uma vez, em segundo plano, para
+`PROXY_HEIGHT` linhas com keyframe em todo frame, então buscar custa uma única
+decodificação. Os frames saem um a um, sem duplicar nem descartar nenhum
+(passthrough), e o proxy só é aceito se tiver exatamente o mesmo número de
+frames do original: o frame n do proxy é o frame n do vídeo. Serve apenas
+para navegar; relatórios e exportações continuam lendo o arquivo original.
+"""
+import os
+import subprocess
+import threading
+from fractions import Fraction
+
+from frame_index import build_index, cache_dir, load_or_build_index
+
+try:
+    import av  # PyAV (opcional): transcodifica sem depender do ffmpeg no PATH
+except ImportError:
+    av = None
+
+PROXY_HEIGHT = 360
+PROXY_CRF = 28
+
+
+def proxy_path(video_hash):
+    return os.path.join(cache_dir("proxies"), f"{video_hash}_{PROXY_HEIGHT}p.mp4")
+
+
+def proxy_size(width, height, max_height=PROXY_HEIGHT):
+    """Tamanho do proxy mantendo a proporção, com dimensões pares (exigência do yuv420p)"""
+    if height <= max_height:
+        return width - width % 2, height - height % 2
+    return max(round(width * max_height / height / 2) * 2, 2), max_height
+
+
+def _transcode_pyav(path, out, progress=None, stop=None):
+    with av.open(path) as src, av.open(out, "w", format="mp4") as dst:
+        in_stream = src.streams.video[0]
+        in_stream.thread_type = "AUTO"
+        rate = in_stream.average_rate or Fraction(30)
+        width, height = proxy_size(in_stream.codec_context.width, in_stream.codec_context.height)
+        out_stream = dst.add_stream("libx264", rate=rate)
+        out_stream.width, out_stream.height, out_stream.pix_fmt = width, height, "yuv420p"
+        out_stream.codec_context.gop_size = 1  # todo frame é keyframe
+        out_stream.options = {"preset": "ultrafast", "crf": str(PROXY_CRF), "tune": "fastdecode"}
+        for n, frame in enumerate(src.decode(in_stream)):
+            if stop and stop():
+                return False
+            # numeração própria: o frame n do proxy é o n-ésimo frame exibido do original
+            img = frame.reformat(width=width, height=height, format="yuv420p")
+            img.pts, img.time_base = n, 1 / rate
+            for packet in out_stream.encode(img):
+                dst.mux(packet)
+            if progress and n % 30 == 0:
+                progress(n)
+        for packet in out_stream.encode():
+            dst.mux(packet)
+    return True
+
+
+def _transcode_ffmpeg(path, out, progress=None, stop=None):
+    scale = f"scale=-2:trunc(min({PROXY_HEIGHT}\\,ih)/2)*2"
+    cmd = [
+        "ffmpeg", "-y", "-v", "error", "-i", path, "-map", "0:v:0", "-an", "-sn",
+        "-vf", scale, "-fps_mode", "passthrough",
+        "-c:v", "libx264", "-preset", "ultrafast", "-tune", "fastdecode", "-crf", str(PROXY_CRF),
+        "-g", "1", "-pix_fmt", "yuv420p", "-progress", "pipe:1", "-f", "mp4", out,
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    for line in proc.stdout:
+        if stop and stop():
+            proc.kill()
+            proc.wait()
+            return False
+        if progress and line.startswith("frame="):
+            progress(int(line.split("=", 1)[1] or 0))
+    if proc.wait() != 0:
+        raise RuntimeError(f"ffmpeg falhou: {proc.stderr.read().strip()[-500:]}")
+    return True
+
+
+def build_proxy(path, index, progress=None, stop=None):
+    """Gera o proxy de `path` e confere o mapeamento de frames.
+
+    progress(frames_prontos) é chamado durante a transcodificação; stop() -> True
+    interrompe. Devolve o caminho do proxy ou None se interrompido.
+    """
+    out = proxy_path(index.video_hash)
+    tmp = out + ".part.mp4"
+    try:
+        if av is not None:
+            done = _transcode_pyav(path, tmp, progress, stop)
+        else:
+            done = _transcode_ffmpeg(path, tmp, progress, stop)
+        if not done:
+            return None
+        count = build_index(tmp).frame_count
+        if count != index.frame_count:
+            raise ValueError(f"Proxy com {count} frames, original com {index.frame_count}")
+        os.replace(tmp, out)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return out
+
+
+def load_proxy(index):
+    """(caminho, índice) do proxy já gerado para este vídeo, ou None"""
+    path = proxy_path(index.video_hash)
+    if not os.path.exists(path):
+        return None
+    proxy_index = load_or_build_index(path)
+    if proxy_index.frame_count != index.frame_count:
+        return None
+    return path, proxy_index
+
+
+class ProxyBuilder:
+    """Gera (ou reaproveita) o proxy em segundo plano; o resultado fica em `result`"""
+
+    def __init__(self, path, index):
+        self.path = path
+        self.index = index
+        self.done = 0
+        self.result = None  # (caminho, índice do proxy)
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    @property
+    def fraction(self):
+        return min(self.done / max(self.index.frame_count, 1), 1.0)
+
+    def _progress(self, done):
+        self.done = done
+
+    def _run(self):
+        try:
+            self.result = load_proxy(self.index)
+            if self.result is None and build_proxy(self.path, self.index, self._progress, self._stop.is_set):
+                self.result = load_proxy(self.index)
+        except Exception as e:
+            self.error = e
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
@@ -0,0 +1,270 @@
+"""Geração de relatórios CSV e PDF sem depender da interface gráfica.
+
+Usado pelo `export_csv`/`export_pdf` do app desktop, pelo Streamlit e pelo
+modo em lote (`python -m j1nx batch`). As miniaturas chegam como bytes JPEG já
+prontos. O PDF é desenhado em fluxo, direto no canvas, então a memória não
+cresce com uma lista de flowables, e relatórios enormes podem ser divididos em
+volumes numerados. Anotações por trecho (início, fim, nota, tags) saem como
+uma única entrada, com a miniatura do frame central do trecho.
+"""
+import csv
+import io
+import json
+import os
+
+import pandas as pd
+from reportlab import rl_config
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph
+
+from annotation_store import parse_tags
+import perf
+
+GLOBAL_COMMENT_ROW = "Comentário Global"
+REPORT_TITLE = "Relatório de Anotações por Frame"
+PAGE_MARGIN = 40
+VOLUME_SIZE = 1000  # anotações por volume nos relatórios divididos
+PROGRESS_EVERY = 25
+
+# JPEGs entram no PDF como binário: a codificação ASCII85 (em Python puro sem o
+# rl_accel) dominava o tempo de geração e aumentava o arquivo em 25%
+rl_config.useA85 = 0
+
+
+def _atomic_path(path):
+    # escreve num temporário ao lado e renomeia: uma interrupção nunca deixa relatório pela metade
+    return path + ".part"
+
+
+def range_label(start, end):
+    return f"{start}-{end}"
+
+
+def representative_frame(start, end):
+    """Frame cuja miniatura representa o trecho no relatório"""
+    return (start + end) // 2
+
+
+def report_entries(annotations, ranges=()):
+    """Notas por frame e trechos [(início, fim ou None, nota, tags)] em ordem de início"""
+    entries = [(f, None, n, ()) for f, n in annotations.items()]
+    entries.extend((start, end, note, tuple(tags)) for start, end, note, tags in ranges)
+    return sorted(entries, key=lambda e: (e[0], -1 if e[1] is None else e[1]))
+
+
+def report_frames(annotations, ranges=()):
+    """Frames que precisam de miniatura no PDF"""
+    frames = set(annotations)
+    frames.update(representative_frame(start, end) for start, end, _, _ in ranges)
+    return sorted(frames)
+
+
+def csv_rows(annotations, global_comment, ranges=()):
+    """Linhas do CSV: trechos têm Frame "início-fim" e a coluna Tags"""
+    rows = []
+    for start, end, note, tags in report_entries(annotations, ranges):
+        if end is None:
+            rows.append({"Frame": start, "Observação": note})
+        else:
+            rows.append({"Frame": range_label(start, end), "Observação": note, "Tags": ", ".join(tags)})
+    rows.append({"Frame": GLOBAL_COMMENT_ROW, "Observação": global_comment})
+    return rows
+
+
+def write_csv(path, annotations, global_comment, ranges=()):
+    rows = csv_rows(annotations, global_comment, ranges)
+    tmp = _atomic_path(path)
+    with perf.stage("csv.write"):
+        pd.DataFrame(rows).to_csv(tmp, index=False, encoding="utf-8-sig")
+    os.replace(tmp, path)
+
+
+class _JpegReader(ImageReader):
+    # o canvas só chama getRGBData para dar nome à imagem, e imagens de mesmo nome
+    # são gravadas uma única vez: nomear pelos bytes do JPEG deduplica miniaturas
+    # idênticas sem decodificá-las (elas são embutidas sem recodificar)
+    def __init__(self, data):
+        super().__init__(io.BytesIO(data))
+        self._jpeg = data
+        self._dataA = None  # JPEG não tem canal alfa
+
+    def getRGBData(self):
+        return self._jpeg
+
+
+class PdfReport:
+    """Um arquivo PDF desenhado direto no canvas, anotação por anotação.
+
+    Não há lista de flowables: cada miniatura vai para o documento assim que é
+    desenhada (o JPEG é embutido sem recodificar) e só a página atual fica em
+    aberto. Miniaturas idênticas são gravadas uma única vez.
+    """
+
+    def __init__(self, target, title=REPORT_TITLE, volume=None, intro=None, image_size=None):
+        self.canvas = canvas.Canvas(target, pagesize=letter, pageCompression=1)
+        self.page_width, self.page_height = letter
+        self.width = self.page_width - 2 * PAGE_MARGIN
+        self.volume = volume  # (número, total) quando o relatório é dividido
+        self.image_size = image_size  # None = tamanho da própria miniatura
+        self.styles = _styles()
+        self._page = 1
+        self._top = self.page_height - PAGE_MARGIN
+        self._y = self._top
+        if volume is not None:
+            title = f"{title} (volume {volume[0]} de {volume[1]})"
+        self._paragraph(Paragraph(title, self.styles["title"]))
+        if intro:
+            self._paragraph(Paragraph(intro, self.styles["frame"]))
+
+    def _room(self):
+        return self._y - PAGE_MARGIN
+
+    def _new_page(self):
+        self._footer()
+        self.canvas.showPage()
+        self._page += 1
+        self._y = self._top
+
+    def _footer(self):
+        label = f"Página {self._page}"
+        if self.volume is not None:
+            label = f"Volume {self.volume[0]}/{self.volume[1]} · {label}"
+        self.canvas.setFont("Helvetica", 8)
+        self.canvas.drawRightString(self.page_width - PAGE_MARGIN, PAGE_MARGIN / 2, label)
+
+    def _paragraph(self, para):
+        """Desenha o parágrafo, continuando na página seguinte se não couber"""
+        space_after = para.style.spaceAfter
+        while para is not None:
+            _, height = para.wrap(self.width, self._room())
+            if height <= self._room() or self._y == self._top:
+                para.drawOn(self.canvas, PAGE_MARGIN, self._y - height)
+                self._y -= height + space_after
+                return
+            parts = para.split(self.width, self._room())
+            if len(parts) < 2:
+                self._new_page()
+                continue
+            first, para = parts
+            _, height = first.wrap(self.width, self._room())
+            first.drawOn(self.canvas, PAGE_MARGIN, self._y - height)
+            self._new_page()
+
+    def _image_size(self, reader):
+        width, height = self.image_size or reader.getSize()
+        scale = min(self.width / width, 1.0)
+        return width * scale, height * scale
+
+    def add(self, frame_number, note, thumbnail=None, end=None, tags=()):
+        """Miniatura (bytes JPEG, opcional) e observação de um frame ou do trecho até `end`"""
+        if end is None:
+            label = f"Frame {frame_number}"
+        else:
+            label = f"Frames {frame_number}–{end}"
+        if tags:
+            label += f" [{', '.join(tags)}]"
+        caption = Paragraph(f"<b>{label}</b>: {note}", self.styles["frame"])
+        if thumbnail:
+            reader = _JpegReader(thumbnail)
+            width, height = self._image_size(reader)
+            # a miniatura não fica separada da primeira linha da legenda
+            if height + caption.style.leading > self._room() and self._y != self._top:
+                self._new_page()
+            self.canvas.drawImage(reader, PAGE_MARGIN, self._y - height, width, height)
+            self._y -= height
+        self._paragraph(caption)
+
+    def add_global_comment(self, text):
+        self._new_page()
+        self._paragraph(Paragraph("Comentário Global", self.styles["title"]))
+        self._paragraph(Paragraph(text, self.styles["comment"]))
+
+    def close(self):
+        self._footer()
+        self.canvas.save()
+
+
+def _styles():
+    styles = getSampleStyleSheet()
+    return {
+        "title": ParagraphStyle("title", parent=styles["Heading1"], alignment=TA_CENTER, fontSize=16, spaceAfter=12),
+        "frame": ParagraphStyle("frame", parent=styles["Normal"], alignment=TA_JUSTIFY, fontSize=12, spaceAfter=10),
+        "comment": ParagraphStyle("comment", parent=styles["Normal"], alignment=TA_CENTER, fontSize=12),
+    }
+
+
+def write_pdf(path, annotations, global_comment, thumbnails, progress=None, volume_size=None,
+              intro=None, image_size=None, ranges=()):
+    """Gera o relatório PDF em fluxo e devolve a lista de arquivos criados.
+
+    thumbnails: {frame: bytes JPEG} ou um objeto com get_bytes(frame) (como o
+    ThumbnailStore), lido uma miniatura por vez; frames sem miniatura saem só com
+    o texto. ranges: [(início, fim, nota, tags)], uma entrada por trecho com a
+    miniatura de `representative_frame`. Com volume_size, relatórios maiores são divididos em
+    `<nome>_vol01.pdf`, `<nome>_vol02.pdf`... e progress(feitas, total) é
+    chamado a cada PROGRESS_EVERY anotações.
+    """
+    get_thumbnail = getattr(thumbnails, "get_bytes", None) or thumbnails.get
+    items = report_entries(annotations, ranges)
+    per_volume = volume_size or max(len(items), 1)
+    volumes = max(-(-len(items) // per_volume), 1)
+    stem, ext = os.path.splitext(path)
+    digits = max(len(str(volumes)), 2)
+
+    paths = []
+    for v in range(volumes):
+        target = path if volumes == 1 else f"{stem}_vol{v + 1:0{digits}d}{ext}"
+        tmp = _atomic_path(target)
+        with perf.stage("pdf.build"):
+            report = PdfReport(tmp, volume=None if volumes == 1 else (v + 1, volumes),
+                               intro=intro, image_size=image_size)
+            first = v * per_volume
+            for done, (f, end, n, tags) in enumerate(items[first:first + per_volume], first + 1):
+                thumbnail = get_thumbnail(f if end is None else representative_frame(f, end))
+                report.add(f, n, thumbnail, end, tags)
+                if progress and (done % PROGRESS_EVERY == 0 or done == len(items)):
+                    progress(done, len(items))
+            if v == volumes - 1:
+                report.add_global_comment(global_comment)
+            report.close()
+        os.replace(tmp, target)
+        paths.append(target)
+    return paths
+
+
+def load_annotations(path):
+    """Lê anotações de um JSON ou de um CSV no formato exportado.
+
+    JSON: {"annotations": {"frame": "nota", ...}, "ranges": [{"start": 0, "end": 9,
+    "note": "...", "tags": [...]}, ...], "global_comment": "..."} ou apenas
+    {"frame": "nota", ...}. No CSV, trechos têm Frame "início-fim" e a coluna
+    Tags. Devolve (anotações, trechos [(início, fim, nota, tags)], comentário global).
+    """
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        ranges = []
+        if "annotations" in data:
+            notes, comment = data["annotations"], data.get("global_comment", "")
+            ranges = [(int(r["start"]), int(r["end"]), str(r.get("note", "")), tuple(r.get("tags", ())))
+                      for r in data.get("ranges", [])]
+        else:
+            notes, comment = data, ""
+        return {int(k): str(v) for k, v in notes.items()}, ranges, comment
+
+    annotations, ranges, comment = {}, [], ""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            frame, note = row.get("Frame", ""), row.get("Observação", "") or ""
+            if frame == GLOBAL_COMMENT_ROW:
+                comment = note
+            elif "-" in frame:
+                start, end = frame.split("-", 1)
+                ranges.append((int(start), int(end), note, parse_tags(row.get("Tags") or "")))
+            elif frame.strip():
+                annotations[int(frame)] = note
+    return annotations, ranges, comment
@@ -0,0 +1,150 @@
+"""Detecção de cortes de cena em uma passada, com cálculo vetorizado em NumPy.
+
+O vídeo é lido uma vez, cada frame já sai do decoder (`FrameSource`) reduzido
+para `ANALYSIS_SIZE` e os frames são processados em lotes: histograma de cor
+(16 níveis por canal) e diferença absoluta média em tons de cinza entre frames consecutivos. A
+pontuação por frame e os cortes ficam num arquivo lateral no cache, pelo hash
+do vídeo, e servem tanto para pular entre cortes quanto para sugerir frames a
+anotar.
+"""
+import bisect
+import os
+
+import numpy as np
+
+from frame_index import cache_dir
+from frame_source import open_source
+
+SCENES_VERSION = 1
+ANALYSIS_SIZE = (64, 36)
+BATCH = 256
+BINS = 16
+MIN_SCORE = 0.05  # abaixo disso nunca é corte
+CUT_RATIO = 3.0  # corte = pico ao menos CUT_RATIO vezes a mediana da vizinhança
+WINDOW = 31
+MIN_SHOT_FRAMES = 8
+
+
+class SceneCuts:
+    """Pontuação de mudança por frame (0..1) e frames onde começa um novo plano"""
+
+    def __init__(self, scores, cuts):
+        self.scores = np.asarray(scores, dtype=np.float32)
+        self.cuts = np.asarray(cuts, dtype=np.int64)
+
+    def next_cut(self, frame_number):
+        i = bisect.bisect_right(self.cuts, frame_number)
+        return int(self.cuts[i]) if i < len(self.cuts) else None
+
+    def prev_cut(self, frame_number):
+        i = bisect.bisect_left(self.cuts, frame_number) - 1
+        return int(self.cuts[i]) if i >= 0 else None
+
+    def suggest_frames(self, count, min_gap=MIN_SHOT_FRAMES):
+        """Frames de maior mudança, a pelo menos min_gap frames uns dos outros"""
+        chosen = []
+        for f in np.argsort(self.scores)[::-1]:
+            if self.scores[f] <= 0 or len(chosen) >= count:
+                break
+            if all(abs(int(f) - c) >= min_gap for c in chosen):
+                chosen.append(int(f))
+        return sorted(chosen)
+
+    def save(self, path):
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, version=SCENES_VERSION, scores=self.scores, cuts=self.cuts)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data["version"]) != SCENES_VERSION:
+                raise ValueError("Versão de análise incompatível")
+            return cls(data["scores"], data["cuts"])
+
+
+def _batch_scores(batch, prev_hist, prev_gray):
+    """Pontuações de um lote (B, h, w, 3) em relação ao frame anterior"""
+    n, h, w, _ = batch.shape
+    # histograma por canal de todos os frames do lote com um único bincount
+    q = (batch >> 4).astype(np.int64) + np.arange(3) * BINS
+    q = q.reshape(n, -1) + (np.arange(n) * 3 * BINS)[:, None]
+    hist = np.bincount(q.ravel(), minlength=n * 3 * BINS).reshape(n, 3 * BINS) / float(h * w)
+    gray = batch.mean(axis=3, dtype=np.float32)
+
+    hists = hist if prev_hist is None else np.vstack([prev_hist[None], hist])
+    grays = gray if prev_gray is None else np.concatenate([prev_gray[None], gray])
+    # cada canal soma 1, então a diferença L1 total vai de 0 a 6
+    hist_diff = np.abs(np.diff(hists, axis=0)).sum(axis=1) / 6.0
+    mad = np.abs(np.diff(grays, axis=0)).mean(axis=(1, 2)) / 255.0
+    scores = 0.5 * (hist_diff + mad)
+    if prev_hist is None:
+        scores = np.concatenate([[0.0], scores])  # primeiro frame do vídeo
+    return scores, hist[-1], gray[-1]
+
+
+def detect_cuts(scores, floor=MIN_SCORE, ratio=CUT_RATIO, window=WINDOW, min_shot=MIN_SHOT_FRAMES):
+    """Limiar adaptativo: o frame se destaca da mediana local (movimento contínuo não conta)"""
+    if len(scores) == 0:
+        return []
+    padded = np.pad(scores, window // 2, mode="edge")
+    local = np.median(np.lib.stride_tricks.sliding_window_view(padded, window), axis=1)
+    cuts = []
+    for f in np.flatnonzero((scores >= floor) & (scores >= ratio * local)):
+        if not cuts or f - cuts[-1] >= min_shot:
+            cuts.append(int(f))
+    return cuts
+
+
+def analyze(path, total_frames=None, progress=None, stop=None):
+    """Lê o vídeo uma vez e calcula pontuações e cortes.
+
+    progress(frames_lidos, total) é chamado a cada lote; stop() -> True interrompe.
+    """
+    source = open_source(path, size=ANALYSIS_SIZE)
+    total = total_frames or source.frame_count
+    width, height = ANALYSIS_SIZE
+    buf = np.empty((BATCH, height, width, 3), dtype=np.uint8)
+    parts, prev_hist, prev_gray, done = [], None, None, 0
+    try:
+        while True:
+            n = 0
+            while n < BATCH:
+                frame = source.read()
+                if frame is None:
+                    break
+                buf[n] = frame
+                n += 1
+            if n == 0:
+                break
+            scores, prev_hist, prev_gray = _batch_scores(buf[:n], prev_hist, prev_gray)
+            parts.append(scores)
+            done += n
+            if progress:
+                progress(done, total)
+            if stop and stop():
+                return None
+            if n < BATCH:
+                break
+    finally:
+        source.close()
+    scores = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+    return SceneCuts(scores, detect_cuts(scores))
+
+
+def scenes_path(video_hash):
+    return os.path.join(cache_dir("scenes"), f"{video_hash}.npz")
+
+
+def load_or_analyze(path, video_hash, total_frames=None, progress=None, stop=None):
+    """Análise salva no cache lateral; só lê o vídeo na primeira vez"""
+    sidecar = scenes_path(video_hash)
+    if os.path.exists(sidecar):
+        try:
+            return SceneCuts.load(sidecar)
+        except Exception:
+            pass
+    result = analyze(path, total_frames, progress, stop)
+    if result is not None:
+        result.save(sidecar)
+    return result
@@ -0,0 +1,56 @@
+import sqlite3
+
+from annotation_store import AnnotationStore
+
+
+def test_failed_write_is_requeued_and_retried(tmp_path, monkeypatch):
+    store = AnnotationStore("video", db_path=str(tmp_path / "notes.sqlite3"))
+    write = store._write
+    calls = []
+
+    def locked(*args):
+        calls.append(args)
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(store, "_write", locked)
+    store[3] = "primeira"
+    store.flush()
+    assert isinstance(store.last_error, sqlite3.OperationalError)
+    assert store._pending == {3: "primeira"}
+
+    # edição feita enquanto o banco estava travado não é sobrescrita pelo lote devolvido
+    store[3] = "segunda"
+    monkeypatch.setattr(store, "_write", write)
+    store.flush()
+    assert store.last_error is None
+    assert not store._pending
+    store.close()
+
+    assert calls
+    reopened = AnnotationStore("video", db_path=str(tmp_path / "notes.sqlite3"))
+    assert dict(reopened) == {3: "segunda"}
+    reopened.close()
+
+
+def test_reopen_keeps_notes_ranges_and_comment(tmp_path):
+    db = str(tmp_path / "notes.sqlite3")
+    store = AnnotationStore("video", db_path=db)
+    store[10] = "nota"
+    store[20] = "apagada"
+    del store[20]
+    kept = store.add_range(40, 30, "trecho", ("falha", "oclusão"))
+    removed = store.add_range(1, 2, "removido")
+    store.remove_range(removed)
+    store.global_comment = "comentário"
+    store.close()
+
+    reopened = AnnotationStore("video", db_path=db)
+    assert dict(reopened) == {10: "nota"}
+    assert reopened.ranges() == [(kept, 30, 40, "trecho", ("falha", "oclusão"))]
+    assert reopened.ranges_at(35) == reopened.ranges()
+    assert reopened.global_comment == "comentário"
+    # outro vídeo no mesmo banco não vê estas anotações
+    other = AnnotationStore("outro", db_path=db)
+    assert len(other) == 0
+    other.close()
+    reopened.close()
@@ -0,0 +1,31 @@
+import random
+
+from intervals import IntervalIndex
+
+
+def _brute(intervals, start, end):
+    return [key for s, e, key in sorted(intervals) if s <= end and e >= start]
+
+
+def test_at_and_overlapping_match_brute_force():
+    rng = random.Random(0)
+    intervals = []
+    for key in range(300):
+        start = rng.randrange(1000)
+        intervals.append((start, start + rng.randrange(80), key))
+    index = IntervalIndex(intervals)
+    assert len(index) == len(intervals)
+    for frame in range(-5, 1100):
+        assert index.at(frame) == _brute(intervals, frame, frame)
+    for _ in range(200):
+        start = rng.randrange(1100)
+        end = start + rng.randrange(50)
+        assert index.overlapping(start, end) == _brute(intervals, start, end)
+
+
+def test_empty_and_single_frame_intervals():
+    assert IntervalIndex().at(0) == []
+    index = IntervalIndex([(5, 5, "a"), (0, 10, "b")])
+    assert index.at(5) == ["b", "a"]
+    assert index.at(6) == ["b"]
+    assert index.at(11) == []
@@ -0,0 +1,139 @@
+"""Miniaturas comprimidas em disco, por vídeo (hash) e número de frame.
+
+Cada vídeo tem um arquivo de dados só de acréscimo (`thumbs.bin`, lido via
+mmap) com os bytes JPEG já codificados e um índice de registros fixos
+(`thumbs.idx`: frame, offset, tamanho). Um pequeno conjunto quente fica em
+memória; o restante é lido do disco sob demanda, então a memória não cresce
+com a duração da sessão e o PDF usa os bytes prontos sem recodificar.
+"""
+import io
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+import cv2
+from PIL import Image
+
+from frame_index import cache_dir
+
+_RECORD = struct.Struct("<qQI")  # frame, offset, tamanho
+THUMB_SIZE = (250, 250)
+DEFAULT_HOT_ITEMS = 64
+
+
+def encode_thumbnail(img, size=THUMB_SIZE, fmt="JPEG", quality=85):
+    """Reduz uma imagem PIL (ou frame BGR) e devolve os bytes codificados"""
+    if not isinstance(img, Image.Image):
+        img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    else:
+        img = img.copy()
+    img.thumbnail(size)
+    buf = io.BytesIO()
+    img.convert("RGB").save(buf, format=fmt, quality=quality)
+    return buf.getvalue()
+
+
+class ThumbnailStore:
+    """Cache de miniaturas em disco com conjunto quente em memória"""
+
+    def __init__(self, video_hash, size=THUMB_SIZE, fmt="JPEG", quality=85, hot_items=DEFAULT_HOT_ITEMS):
+        self.size = size
+        self.fmt = fmt
+        self.quality = quality
+        self.hot_items = hot_items
+        self._dir = cache_dir("thumbs", f"{video_hash}_{size[0]}x{size[1]}_{fmt.lower()}")
+        self._data_path = os.path.join(self._dir, "thumbs.bin")
+        self._index_path = os.path.join(self._dir, "thumbs.idx")
+        self._lock = threading.Lock()
+        self._hot = OrderedDict()
+        self._offsets = {}
+        self._mmap = None
+        self._mapped_size = 0
+        self._load_index()
+        self._data = open(self._data_path, "ab")
+        self._index = open(self._index_path, "ab")
+
+    def _load_index(self):
+        if not os.path.exists(self._index_path):
+            return
+        data_size = os.path.getsize(self._data_path) if os.path.exists(self._data_path) else 0
+        with open(self._index_path, "rb") as f:
+            raw = f.read()
+        # registro final incompleto (queda no meio da escrita) é ignorado
+        usable = len(raw) - len(raw) % _RECORD.size
+        for frame, offset, length in _RECORD.iter_unpack(raw[:usable]):
+            if offset + length <= data_size:
+                self._offsets[frame] = (offset, length)
+
+    def __contains__(self, frame_number):
+        return frame_number in self._offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def frames(self):
+        return sorted(self._offsets)
+
+    def put_bytes(self, frame_number, data):
+        with self._lock:
+            offset = self._data.seek(0, os.SEEK_END)
+            self._data.write(data)
+            self._data.flush()
+            self._index.write(_RECORD.pack(frame_number, offset, len(data)))
+            self._index.flush()
+            self._offsets[frame_number] = (offset, len(data))
+            self._remember(frame_number, data)
+
+    def put(self, frame_number, img):
+        """Guarda a miniatura de uma imagem PIL ou frame BGR"""
+        self.put_bytes(frame_number, encode_thumbnail(img, self.size, self.fmt, self.quality))
+
+    def _remember(self, frame_number, data):
+        self._hot[frame_number] = data
+        self._hot.move_to_end(frame_number)
+        while len(self._hot) > self.hot_items:
+            self._hot.popitem(last=False)
+
+    def _read(self, offset, length):
+        if self._mmap is None or offset + length > self._mapped_size:
+            # o arquivo cresceu desde o último mapeamento: remapeia
+            if self._mmap is not None:
+                self._mmap.close()
+            size = os.path.getsize(self._data_path)
+            with open(self._data_path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            self._mapped_size = size
+        return self._mmap[offset:offset + length]
+
+    def get_bytes(self, frame_number):
+        """Bytes codificados da miniatura (ou None)"""
+        with self._lock:
+            data = self._hot.get(frame_number)
+            if data is not None:
+                self._hot.move_to_end(frame_number)
+                return data
+            entry = self._offsets.get(frame_number)
+            if entry is None:
+                return None
+            data = self._read(*entry)
+            self._remember(frame_number, data)
+            return data
+
+    def get_image(self, frame_number):
+        data = self.get_bytes(frame_number)
+        return Image.open(io.BytesIO(data)) if data is not None else None
+
+    def missing(self, frame_numbers):
+        """Frames (ordenados) que ainda não têm miniatura"""
+        return sorted(n for n in set(frame_numbers) if n not in self._offsets)
+
+    def close(self):
+        with self._lock:
+            self._data.close()
+            self._index.close()
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self._hot.clear()
@@ -1,17 +1,26 @@
 import streamlit as st
-import cv2
+import hashlib
+import json
 import subprocess
 import tempfile
 import os
+import weakref
+import numpy as np
 import pandas as pd
 from PIL import Image
 import io
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as RLImage, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+import zipfile
+
+from annotation_store import AnnotationStore, parse_tags
+from extraction import extract_thumbnails
+from frame_index import load_or_build_index
+from frame_source import open_source
+from navigator import FrameNavigator
+import perf
+from proxy import ProxyBuilder
+from reports import VOLUME_SIZE, csv_rows, report_frames, write_pdf
+from scene_cuts import load_or_analyze
+from thumb_store import ThumbnailStore
 
 st.title("Reprodutor de Vídeo por Frames com Anotações e Relatório (CSV + PDF)")
 
@@ -30,40 +39,109 @@ def fix_video_with_ffmpeg(input_path):
     proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     return (proc.returncode == 0, out_path, proc.stderr.decode("utf-8"))
 
-def open_capture(path):
-    if hasattr(cv2, "CAP_FFMPEG"):
-        cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG)
+def open_video_source(path, index):
+    # backend escolhido pelo codec (ou J1NX_BACKEND); aqui os frames só são
+    # exibidos, então já saem do decoder em RGB, sem cvtColor a cada rerun
+    return open_source(path, index, rgb=True)
+
+@st.cache_resource(show_spinner="Indexando frames (apenas na primeira abertura deste vídeo)...")
+def load_index(content_hash, _path):
+    # Varredura de pacotes (sem decodificar) salva em cache pelo hash do arquivo;
+    # o índice é imutável, então é compartilhado entre sessões pelo hash do upload
+    return load_or_build_index(_path)
+
+def _release_video(navigators, proxies, annotations, paths):
+    # Chamado quando a sessão é descartada (ou outro vídeo é enviado)
+    for builder in proxies:
+        builder.stop()
+    for navigator in navigators:
+        navigator.close()
+    if annotations is not None:
+        annotations.close()  # grava o que ainda estiver pendente
+    for p in paths:
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+class LoadedVideo:
+    """Upload já preparado para esta sessão: arquivo temporário, captura e índice.
+
+    Mantido em st.session_state entre os reruns; os arquivos temporários são
+    apagados quando a sessão termina (o objeto é coletado) ou o vídeo muda.
+    """
+
+    def __init__(self, file_id, content_hash, path, index, navigator, annotations=None):
+        self.file_id = file_id
+        self.content_hash = content_hash
+        self.path = path
+        self.index = index
+        self.navigator = navigator
+        self.annotations = annotations
+        self.total_frames = index.frame_count if index else 0
+        self.scenes = None  # cortes de cena, calculados no primeiro uso
+        self.proxy = None  # ProxyBuilder, só quando o modo proxy é ligado
+        self.using_proxy = False
+        self._navigators = [navigator] if navigator is not None else []
+        self._proxies = []
+        self._finalizer = weakref.finalize(
+            self, _release_video, self._navigators, self._proxies, annotations, [path])
+
+    def start_proxy(self):
+        if self.proxy is None:
+            self.proxy = ProxyBuilder(self.path, self.index)
+            self._proxies.append(self.proxy)
+
+    def set_proxy(self, enabled):
+        """Navega pelo proxy (se pronto) ou pelo original; os números de frame são os mesmos"""
+        enabled = enabled and self.proxy is not None and self.proxy.result is not None
+        if enabled == self.using_proxy:
+            return
+        if enabled and len(self._navigators) == 1:
+            proxy_path, proxy_index = self.proxy.result
+            self._navigators.append(FrameNavigator(open_video_source(proxy_path, proxy_index)))
+        self.navigator = self._navigators[1 if enabled else 0]
+        self.using_proxy = enabled
+
+    def close(self):
+        self._finalizer()
+
+@st.fragment(run_every=1.0)
+def proxy_progress(video):
+    # atualiza só este trecho enquanto o proxy é gerado; pronto, recarrega a página para trocar a navegação
+    if video.proxy.running:
+        st.progress(video.proxy.fraction, text=f"Gerando proxy de navegação... {video.proxy.fraction:.0%}")
     else:
-        cap = cv2.VideoCapture(path)
-    return cap
-
-def accurate_frame_count(path):
-    cap = open_capture(path)
-    count = 0
-    with st.spinner("Contando frames com precisão (pode levar algum tempo)..."):
-        while True:
-            ret, _ = cap.read()
-            if not ret:
-                break
-            count += 1
-    cap.release()
-    return count
+        st.rerun()
+
+@st.cache_resource(show_spinner="Detectando cortes de cena (uma passada pelo vídeo)...")
+def scene_cuts(video_hash, _path, _total_frames):
+    return load_or_analyze(_path, video_hash, _total_frames)
+
+def prepare_video(uploaded):
+    """Grava o upload em disco uma única vez por conteúdo e abre captura e índice"""
+    data = uploaded.getvalue()
+    content_hash = hashlib.sha1(data).hexdigest()
+    current = st.session_state.get("video")
+    if current is not None:
+        if current.content_hash == content_hash:
+            # mesmo conteúdo reenviado: nada a regravar
+            current.file_id = uploaded.file_id
+            return current
+        current.close()
 
-# --- Upload do vídeo ---
-uploaded = st.file_uploader("Escolha um vídeo", type=["mp4", "avi", "mov"])
-if uploaded is not None:
     fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(uploaded.name)[1] or ".mp4")
     os.close(fd)
     with open(temp_path, "wb") as f:
-        f.write(uploaded.read())
+        f.write(data)
 
-    # Abrir captura e contar frames
-    cap = open_capture(temp_path)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    # Contar frames pelo índice de pacotes
+    index = load_index(content_hash, temp_path)
 
-    if total_frames <= 0:
+    if index.frame_count <= 0:
+        # não deixa o índice vazio em cache para este conteúdo
+        load_index.clear(content_hash, temp_path)
         st.warning("⚠️ Contagem de frames não confiável. Tentando corrigir com ffmpeg...")
-        cap.release()
         if not is_ffmpeg_available():
             st.error("❌ ffmpeg não encontrado no PATH.")
         else:
@@ -71,20 +149,109 @@ if uploaded is not None:
             if not success:
                 st.error("❌ ffmpeg falhou. Últimas linhas de erro:")
                 st.text("\n".join(ffmpeg_err.splitlines()[-10:]))
-                total_frames = accurate_frame_count(temp_path)
+                try:
+                    os.remove(fixed_path)
+                except Exception:
+                    pass
             else:
-                cap = open_capture(fixed_path)
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                if total_frames <= 0:
-                    st.warning("Contagem ainda não confiável. Fazendo leitura frame a frame...")
-                    cap.release()
-                    total_frames = accurate_frame_count(fixed_path)
+                index = load_or_build_index(fixed_path)
                 try:
                     os.remove(temp_path)
                 except Exception:
                     pass
                 temp_path = fixed_path
 
+    navigator = FrameNavigator(open_video_source(temp_path, index)) if index.frame_count > 0 else None
+    # anotações salvas em disco pelo hash do vídeo: reenviar o mesmo arquivo retoma o trabalho
+    annotations = AnnotationStore(index.video_hash) if index.frame_count > 0 else None
+    video = LoadedVideo(uploaded.file_id, content_hash, temp_path, index, navigator, annotations)
+    st.session_state.video = video
+    st.session_state.frame_number = 0
+    if annotations is not None:
+        st.session_state.annotations = annotations
+        st.session_state.global_comment = annotations.global_comment
+    return video
+
+# --- Relatórios ---
+def build_csv_report(annotation_items, global_comment, range_items=()):
+    with perf.stage("csv.build"):
+        export_rows = csv_rows(dict(annotation_items), global_comment, range_items)
+        return pd.DataFrame(export_rows).to_csv(index=False).encode("utf-8")
+
+@st.cache_resource
+def thumbnail_store(video_hash):
+    # miniaturas do PDF em disco, compartilhadas entre sessões e relatórios
+    return ThumbnailStore(video_hash, size=(200, 200))
+
+def report_key(video, annotation_items, global_comment, range_items=()):
+    h = hashlib.sha1(video.content_hash.encode())
+    h.update(json.dumps(annotation_items, ensure_ascii=False).encode("utf-8"))
+    h.update(json.dumps(range_items, ensure_ascii=False).encode("utf-8"))
+    h.update(global_comment.encode("utf-8"))
+    return h.hexdigest()
+
+def timeline_image(total_frames, range_items, current, width=800, height=14):
+    """Linha do tempo com os trechos anotados (laranja) e o frame atual (branco)"""
+    bar = np.full((height, width, 3), 40, dtype=np.uint8)
+    scale = width / max(total_frames, 1)
+    for start, end, _, _ in range_items:
+        bar[2:-2, int(start * scale):max(int((end + 1) * scale), int(start * scale) + 1)] = (255, 159, 26)
+    x = min(int(current * scale), width - 1)
+    bar[:, max(x - 1, 0):x + 1] = 255
+    return bar
+
+def build_pdf_report(video, annotation_items, global_comment, progress=None, range_items=()):
+    """Monta o PDF e devolve (nome do arquivo, bytes): um PDF, ou um .zip com os volumes"""
+    # Texto explicativo
+    intro_text = """
+    Este relatório foi gerado automaticamente por uma aplicação interativa desenvolvida em Python
+    utilizando a biblioteca <b>Streamlit</b>.  
+    
+    A ferramenta permite que o usuário visualize um vídeo quadro a quadro (frames), faça observações
+    específicas sobre cada trecho e registre comentários globais.  
+    
+    O objetivo é fornecer uma análise detalhada do desempenho de modelos de visão computacional ou
+    qualquer outro aspecto que se queira avaliar em vídeos, garantindo <i>transparência</i>,
+    <i>organização</i> e <i>rastreabilidade</i> das anotações realizadas.
+    """
+
+    # Só extrai (em paralelo, uma passada por segmento) as miniaturas que ainda não existem
+    thumbs = thumbnail_store(video.index.video_hash)
+    # (cada trecho usa a miniatura do seu frame central)
+    missing = thumbs.missing(report_frames(dict(annotation_items), range_items))
+    with perf.stage("pdf.thumbnails"):
+        for f, data in extract_thumbnails(video.path, video.index, missing, size=thumbs.size):
+            thumbs.put_bytes(f, data)
+
+    # Desenhado em fluxo num diretório temporário (uma miniatura por vez, lida do
+    # cache em disco); relatórios com mais de VOLUME_SIZE anotações saem em volumes
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = write_pdf(
+            os.path.join(tmp_dir, "relatorio_frames.pdf"), dict(annotation_items), global_comment, thumbs,
+            progress=progress, volume_size=VOLUME_SIZE, intro=intro_text, image_size=(150, 150),
+            ranges=range_items
+        )
+        if len(paths) == 1:
+            with open(paths[0], "rb") as f:
+                return "relatorio_frames.pdf", f.read()
+        zip_buf = io.BytesIO()
+        # PDFs já são comprimidos: o zip só agrupa os volumes
+        with zipfile.ZipFile(zip_buf, "w", zipfile.ZIP_STORED) as zf:
+            for path in paths:
+                zf.write(path, os.path.basename(path))
+        return "relatorio_frames.zip", zip_buf.getvalue()
+
+# --- Upload do vídeo ---
+uploaded = st.file_uploader("Escolha um vídeo", type=["mp4", "avi", "mov"])
+if uploaded is None and "video" in st.session_state:
+    st.session_state.pop("video").close()
+if uploaded is not None:
+    # reruns (slider, botões) reaproveitam o arquivo, a captura e o índice da sessão
+    video = st.session_state.get("video")
+    if video is None or video.file_id != uploaded.file_id:
+        video = prepare_video(uploaded)
+    total_frames = video.total_frames
+
     if total_frames <= 0:
         st.error("❌ Não foi possível obter a contagem de frames.")
     else:
@@ -98,6 +265,17 @@ if uploaded is not None:
         if "global_comment" not in st.session_state:
             st.session_state.global_comment = ""
 
+        # --- Proxy de navegação (relatórios continuam usando o vídeo original) ---
+        if st.toggle("⚡ Navegar por proxy (baixa resolução, busca instantânea)"):
+            video.start_proxy()
+            if video.proxy.running:
+                proxy_progress(video)
+            elif video.proxy.result is None:
+                st.warning(f"⚠️ Não foi possível gerar o proxy: {video.proxy.error}")
+            video.set_proxy(True)
+        else:
+            video.set_proxy(False)
+
         # --- Slider e navegação ---
         st.session_state.frame_number = st.slider(
             "Escolha o frame",
@@ -105,23 +283,47 @@ if uploaded is not None:
             st.session_state.frame_number
         )
 
-        col1, col2 = st.columns(2)
+        # trechos anotados sobre a linha do tempo (só com anotações persistentes)
+        store = st.session_state.annotations if isinstance(st.session_state.annotations, AnnotationStore) else None
+        range_items = tuple(r[1:] for r in store.ranges()) if store is not None else ()
+        if range_items:
+            st.image(timeline_image(total_frames, range_items, st.session_state.frame_number))
+
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
             if st.button("Frame anterior"):
                 st.session_state.frame_number = max(st.session_state.frame_number - 1, 0)
         with col2:
             if st.button("Próximo frame"):
                 st.session_state.frame_number = min(st.session_state.frame_number + 1, total_frames - 1)
+        with col3:
+            if st.button("Corte anterior"):
+                video.scenes = scene_cuts(video.index.video_hash, video.path, total_frames)
+                cut = video.scenes.prev_cut(st.session_state.frame_number)
+                if cut is not None:
+                    st.session_state.frame_number = cut
+        with col4:
+            if st.button("Próximo corte"):
+                video.scenes = scene_cuts(video.index.video_hash, video.path, total_frames)
+                cut = video.scenes.next_cut(st.session_state.frame_number)
+                if cut is not None:
+                    st.session_state.frame_number = cut
+
+        if video.scenes is not None:
+            with st.expander(f"✨ Frames sugeridos para anotar ({len(video.scenes.cuts)} cortes detectados)"):
+                suggested = video.scenes.suggest_frames(10)
+                st.table(pd.DataFrame(
+                    [{"Frame": f, "Mudança": round(float(video.scenes.scores[f]), 3)} for f in suggested]
+                ))
 
         # --- Mostrar frame usando buffer (evita erro ) ---
-        cap.set(cv2.CAP_PROP_POS_FRAMES, st.session_state.frame_number)
-        ret, frame = cap.read()
-        if ret:
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img_pil = Image.fromarray(frame)
-            buf = io.BytesIO()
-            img_pil.save(buf, format="JPEG")
-            buf.seek(0)
+        frame = video.navigator.get(st.session_state.frame_number)
+        if frame is not None:
+            with perf.stage("jpeg.encode"):
+                img_pil = Image.fromarray(frame)
+                buf = io.BytesIO()
+                img_pil.save(buf, format="JPEG")
+                buf.seek(0)
             st.image(buf, caption=f"Frame {st.session_state.frame_number}")
         else:
             st.warning("Não foi possível carregar este frame.")
@@ -134,7 +336,41 @@ if uploaded is not None:
         )
         if st.button("Salvar anotação"):
             st.session_state.annotations[st.session_state.frame_number] = note
-            st.success(f"✅ Anotação salva para o frame {st.session_state.frame_number}")
+            error = getattr(st.session_state.annotations, "last_error", None)
+            if error is not None:
+                st.error(f"❌ Não foi possível gravar as anotações no disco ({error}); nova tentativa em segundo plano.")
+            else:
+                st.success(f"✅ Anotação salva para o frame {st.session_state.frame_number}")
+
+        # --- Anotação por trecho ---
+        if store is not None:
+            # consulta no índice de intervalos: não percorre todos os trechos a cada rerun
+            for range_id, start, end, range_note, tags in store.ranges_at(st.session_state.frame_number):
+                col_info, col_remove = st.columns([5, 1])
+                with col_info:
+                    tag_text = f" `{', '.join(tags)}`" if tags else ""
+                    st.info(f"📏 Frames {start}–{end}{tag_text}: {range_note}")
+                with col_remove:
+                    if st.button("Remover", key=f"remove_range_{range_id}"):
+                        store.remove_range(range_id)
+                        st.rerun()
+
+            with st.expander("📏 Anotar trecho (vários frames de uma vez)"):
+                col_start, col_end = st.columns(2)
+                with col_start:
+                    range_start = st.number_input("Frame inicial", 0, max(total_frames - 1, 0),
+                                                  st.session_state.frame_number)
+                with col_end:
+                    range_end = st.number_input("Frame final", 0, max(total_frames - 1, 0),
+                                                st.session_state.frame_number)
+                range_note = st.text_input("Observação do trecho")
+                range_tags = st.text_input("Tags (separadas por vírgula)")
+                if st.button("Salvar trecho"):
+                    if range_note.strip():
+                        store.add_range(range_start, range_end, range_note.strip(), parse_tags(range_tags))
+                        st.rerun()
+                    else:
+                        st.warning("Escreva a observação do trecho.")
 
         # --- Comentário global ---
         st.subheader("Comentário global sobre o desempenho do modelo")
@@ -143,20 +379,34 @@ if uploaded is not None:
             value=st.session_state.global_comment,
             height=150
         )
+        if isinstance(st.session_state.annotations, AnnotationStore):
+            st.session_state.annotations.global_comment = st.session_state.global_comment
 
         # --- Mostrar anotações ---
-        if st.session_state.annotations:
-            st.subheader("📋 Anotações por frame")
-            df = pd.DataFrame(
-                [{"Frame": f, "Observação": n} for f, n in sorted(st.session_state.annotations.items())]
-            )
-            st.table(df)
+        if st.session_state.annotations or range_items:
+            if st.session_state.annotations:
+                st.subheader("📋 Anotações por frame")
+                df = pd.DataFrame(
+                    [{"Frame": f, "Observação": n} for f, n in sorted(st.session_state.annotations.items())]
+                )
+                st.table(df)
+            if range_items:
+                st.subheader("📏 Anotações por trecho")
+                st.table(pd.DataFrame([
+                    {"Início": start, "Fim": end, "Tags": ", ".join(tags), "Observação": note}
+                    for start, end, note, tags in range_items
+                ]))
 
-            # --- Exportar CSV ---
-            export_rows = [{"Frame": f, "Observação": n} for f, n in sorted(st.session_state.annotations.items())]
-            export_rows.append({"Frame": "Comentário Global", "Observação": st.session_state.global_comment})
-            export_df = pd.DataFrame(export_rows)
-            csv = export_df.to_csv(index=False).encode("utf-8")
+            # --- Exportar (relatórios gerados sob demanda e memorizados) ---
+            # Um relatório por sessão, guardado enquanto (vídeo, anotações, comentário)
+            # não mudarem: nada se acumula num cache do processo a cada edição
+            annotation_items = tuple(sorted(st.session_state.annotations.items()))
+            key = report_key(video, annotation_items, st.session_state.global_comment, range_items)
+            cached_csv = st.session_state.get("csv_report")
+            if cached_csv is None or cached_csv[0] != key:
+                cached_csv = st.session_state.csv_report = (
+                    key, build_csv_report(annotation_items, st.session_state.global_comment, range_items))
+            csv = cached_csv[1]
             st.download_button(
                 label="📥 Baixar relatório CSV",
                 data=csv,
@@ -164,98 +414,49 @@ if uploaded is not None:
                 mime="text/csv"
             )
 
-             # --- Exportar PDF ---
-            pdf_fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
-            os.close(pdf_fd)
-             
-             # Configurar estilos
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(
-                 "title",
-                 parent=styles["Heading1"],
-                 alignment=TA_CENTER,
-                 fontSize=16,
-                 spaceAfter=20
-             )
-            frame_style = ParagraphStyle(
-                 "frame",
-                 parent=styles["Normal"],
-                 alignment=TA_JUSTIFY,
-                 fontSize=12,
-                 leading=16,
-                 spaceAfter=15
-             )
-            comment_style = ParagraphStyle(
-                 "comment",
-                 parent=styles["Normal"],
-                 alignment=TA_CENTER,
-                 fontSize=12,
-                 leading=14,
-                 spaceBefore=20
-             )
-             
-             # Criar documento
-            doc = SimpleDocTemplate(pdf_path, pagesize=letter, rightMargin=40, leftMargin=40, topMargin=40, bottomMargin=40)
-            elements = []
-             
-            # Título
-            elements.append(Paragraph("Relatório de Anotações por Frame", title_style))
-            
-            # Texto explicativo
-            intro_text = """
-            Este relatório foi gerado automaticamente por uma aplicação interativa desenvolvida em Python
-            utilizando a biblioteca <b>Streamlit</b>.  
-            
-            A ferramenta permite que o usuário visualize um vídeo quadro a quadro (frames), faça observações
-            específicas sobre cada trecho e registre comentários globais.  
-            
-            O objetivo é fornecer uma análise detalhada do desempenho de modelos de visão computacional ou
-            qualquer outro aspecto que se queira avaliar em vídeos, garantindo <i>transparência</i>,
-            <i>organização</i> e <i>rastreabilidade</i> das anotações realizadas.
-            """
-            
-            elements.append(Paragraph(intro_text, frame_style))
-            elements.append(Spacer(1, 12))
-
-             # Inserir frames + observações
-            for f, n in sorted(st.session_state.annotations.items()):
-                 # Miniatura do frame
-                 cap.set(cv2.CAP_PROP_POS_FRAMES, f)
-                 ret, frame_img = cap.read()
-                 if ret:
-                     frame_img = cv2.cvtColor(frame_img, cv2.COLOR_BGR2RGB)
-                     pil_img = Image.fromarray(frame_img)
-                     pil_img.thumbnail((200, 200))
-                     img_buf = io.BytesIO()
-                     pil_img.save(img_buf, format="JPEG")
-                     img_buf.seek(0)
-                     elements.append(RLImage(img_buf, width=150, height=150))
-             
-                 # Texto formatado
-                 elements.append(Paragraph(f"<b>Frame {f}</b>: {n}", frame_style))
-             
-             # Comentário global
-            elements.append(PageBreak())
-            elements.append(Paragraph("Comentário Global", title_style))
-            elements.append(Paragraph(st.session_state.global_comment, comment_style))
-            
-            # Montar PDF
-            doc.build(elements)
-            
-            # Baixar PDF
-            with open(pdf_path, "rb") as f:
-                pdf_bytes = f.read()
+            # O PDF só é montado quando pedido; o resultado fica guardado para o mesmo
+            # (vídeo, anotações, comentário) e as miniaturas já extraídas são reaproveitadas
+            cached = st.session_state.get("pdf_report")
+            if cached is None or cached[0] != key:
+                cached = None
+                if st.button("🧾 Gerar relatório PDF"):
+                    bar = st.progress(0.0, text="Gerando relatório PDF...")
+                    file_name, pdf_bytes = build_pdf_report(
+                        video, annotation_items, st.session_state.global_comment,
+                        progress=lambda done, total: bar.progress(done / total, text=f"Gerando relatório PDF... {done}/{total}"),
+                        range_items=range_items
+                    )
+                    bar.empty()
+                    cached = st.session_state.pdf_report = (key, file_name, pdf_bytes)
+            if cached is not None:
+                st.download_button(
+                    label="📥 Baixar relatório PDF",
+                    data=cached[2],
+                    file_name=cached[1],
+                    mime="application/zip" if cached[1].endswith(".zip") else "application/pdf"
+                )
+
+        # --- Desempenho (medição por etapa; vale para o processo inteiro do servidor) ---
+        with st.expander("⏱️ Desempenho"):
+            measuring = st.toggle("Medir etapas (decodificação, conversão, relatórios)", value=perf.is_enabled())
+            if measuring != perf.is_enabled():
+                perf.reset()
+                perf.enable(measuring)
+            caches = video.navigator.caches
+            data = perf.summary(caches)
+            if data["stages"]:
+                st.table(pd.DataFrame.from_dict(data["stages"], orient="index").round(2))
+            st.table(pd.DataFrame.from_dict(data["caches"], orient="index"))
             st.download_button(
-                label="📥 Baixar relatório PDF",
-                data=pdf_bytes,
-                file_name="relatorio_frames.pdf",
-                mime="application/pdf"
+                label="📥 Baixar medições (JSON)",
+                data=perf.to_json(caches),
+                file_name="desempenho.json",
+                mime="application/json"
             )
 
 
 
 
-
 #⠀⠀⠀⠀⠀⠀⠀⠀
 #⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⠀⠀⡀⠀⠀⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
 #⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢈⠇⠀⢠⠡⡻⢨⢣⠎⢀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀